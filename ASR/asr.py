@@ -1,99 +1,287 @@
-import pyaudio
+import sys
+import os
+sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
 import webrtcvad
 import time
-from aip import AipSpeech
-
-# 百度api
-APP_ID = ''
-API_KEY = '' 
-SECRET_KEY = ''
-
-client = AipSpeech(APP_ID, API_KEY, SECRET_KEY)
+import queue
+import asyncio
+import bisect
+import threading
+from ASR.audio_hub import get_microphone_hub
+from ASR.endpoint import Endpointer
+from ASR.energy_gate import EnergyGate
+from ASR.resilient import ResilientASR, CLIENT_ERRORS, get_asr_requester
+from ASR.streaming import StreamingRecognizer
+from ASR.keyword_spotter import KeywordSpotter
 
 class ASRhelper:
-    def __init__(self):
-        # 设置音频参数
-        self.CHUNK = 480  
-        self.FORMAT = pyaudio.paInt16
-        self.CHANNELS = 1
-        self.RATE = 16000
-        self.SILENCE_DURATION = 1.0  
-        self.MAX_RECORD_SECONDS = 5  
-        self.NO_SPEECH_TIMEOUT = 2.0  
+    def __init__(self, hub=None, backend=None, streamer=None, spotter=None):
+        # 麦克风由采集中心统一管理，与打断检测等模块共用同一个输入设备
+        self.hub = hub or get_microphone_hub()
+        # 识别后端按部署选择（环境变量 ASR_BACKEND：baidu / vosk / standin），
+        # 请求经过带超时、重试、对冲和熔断切换的请求层
+        self.requester = ResilientASR(backend) if backend else get_asr_requester()
+        self.backend = self.requester.backends[0]
+        # 流式识别：边说边上传（环境变量 ASR_STREAMING=1 开启，ASR_STREAM_URL 可指向本地替身服务）
+        self.streamer = streamer
+        if self.streamer is None and os.environ.get("ASR_STREAMING") == "1":
+            try:
+                self.streamer = StreamingRecognizer()
+            except ImportError as e:
+                print(f"流式识别不可用: {e}")
+        # 本地关键词检测：唤醒词和退出等控制指令在本地识别，不上传（环境变量 ASR_KWS=1 开启）
+        self.spotter = spotter
+        if self.spotter is None and os.environ.get("ASR_KWS") == "1":
+            try:
+                self.spotter = KeywordSpotter(self.hub)
+            except Exception as e:  # 没装vosk或模型不存在
+                print(f"本地关键词检测不可用: {e}")
+        self.CHUNK = self.hub.CHUNK
+        self.CHANNELS = self.hub.CHANNELS
+        self.RATE = self.hub.RATE
+        self.SILENCE_DURATION = 0.5  # 初始静音阈值，之后随说话人停顿自适应
+        self.MAX_RECORD_SECONDS = 15
+        self.NO_SPEECH_TIMEOUT = 2.0
+        self.BLOCK_FRAMES = 10  # 端点检测每次最多处理的帧数
         # self.voice = "zh-CN-XiaoyiNeural"
 
-        self.vad = webrtcvad.Vad(2)  
-     
-        self.p, self.stream = self.get_audio_stream()
+        self.vad = webrtcvad.Vad(2)
+        self.energy_gate = EnergyGate(self.RATE, self.CHUNK * 1000 // self.RATE)
+        self.endpointer = Endpointer(self.vad, self.RATE, self.SILENCE_DURATION, self.MAX_RECORD_SECONDS,
+                                     on_event=self._on_endpoint_event, gate=self.energy_gate)
+        self.last_endpoint_time = None  # 最近一次判定语音结束的时间
 
-    def get_audio_stream(self):
-        """初始化输入音频流"""
-        p = pyaudio.PyAudio()
-        stream = p.open(format=self.FORMAT,
-                        channels=self.CHANNELS,
-                        rate=self.RATE,
-                        input=True,
-                        frames_per_buffer=self.CHUNK)
-        return p, stream
+        self.running = False
+        self.listening = threading.Event()
+        self._listen_from = 0.0  # 只对该时间之后采集的音频做端点检测
+        self.continuous = False  # 连续聆听：一句话结束后不停止端点检测
+        self.subscription = None
+        self.endpoint_thread = None
 
-    def real_time_recognition(self):
-        """实时语音识别"""
-        # print('*'*40,"可以说话咯😁","*"*40)
+        # 完整语音的输出队列：同步调用用 queue.Queue，异步调用用 asyncio.Queue
+        self._utterances = queue.Queue()
+        self._loop = None
+        self._async_utterances = None
+        # 流式识别时端点检测线程把语音帧送入该队列
+        self._stream_queue = None
+        self._streamed = 0
 
-        #输入流
-        input= []
-        start_time = time.time()
-        speech_started = False
-        last_speech_time = time.time()
+        self.start_capture()
 
-        while True:
-            try:
-                data = self.stream.read(self.CHUNK, exception_on_overflow=False)
-                is_speech = self.vad.is_speech(data, self.RATE)
-
-                if is_speech:
-                    if  speech_started==False:
-                        speech_started = True
-                        # print('*'*10,"可以说话咯😁","*"*10)
-                    last_speech_time = time.time()
-                    input.append(data)
-                else:
-                    if speech_started:
-
-                        if (time.time() - last_speech_time) >= self.SILENCE_DURATION:
-                            print('*'*10,"语音结束🙊",'*'*10)
-                            break
-                if (time.time() - start_time) >= self.MAX_RECORD_SECONDS:
-                    # print("录完了")
+    def start_capture(self):
+        """订阅麦克风并启动端点检测线程，采集从不停止"""
+        self.hub.acquire()
+        self.subscription = self.hub.subscribe("asr")
+        self.running = True
+        self.endpoint_thread = threading.Thread(target=self._endpoint_loop, daemon=True)
+        self.endpoint_thread.start()
+
+    def _endpoint_loop(self):
+        frame_bytes = self.hub.frame_bytes
+        listen_start = None
+        while self.running:
+            block, timestamps = self.subscription.read_block(self.BLOCK_FRAMES, timeout=0.5)
+            if block is None:
+                if self.subscription.closed:
                     break
+                continue
 
-                if not speech_started and (time.time() - start_time) >= self.NO_SPEECH_TIMEOUT:
-                    print("请你提出问题？😾")
-                    start_time = time.time()  # Reset start time
+            # 不在聆听状态时只消费缓冲区，不做端点检测
+            skip = bisect.bisect_left(timestamps, self._listen_from)
+            if not self.listening.is_set() or skip == len(timestamps):
+                listen_start = None
+                continue
+            if skip:
+                block, timestamps = block[skip * frame_bytes:], timestamps[skip:]
+            if listen_start is None:
+                # 新一轮聆听开始
+                self.endpointer.reset()
+                listen_start = timestamps[0]
 
-            except Exception as e:
-                print("录音有错误！！！", str(e))
-                break
-
-        if input:
-            audio_data = b"".join(input)
-            print(f"上传 {len(audio_data)} 个字节到🪰")
-            result = client.asr(audio_data, 'pcm', self.RATE, {'dev_pid': 1537})
-            if result['err_no'] != 0:
-                # print("🧠 用户问：:", result['result'][0])
-
-            
-                print("❌ 识别失败:", result['err_msg'], "错误码:", result['err_no'])
+            utterances = self.endpointer.process_block(block, timestamps)
+            for utterance in utterances:
+                if not self.continuous:
+                    self.listening.clear()
+                listen_start = utterance.endpoint_time
+                self._stream_frames(utterance.frames, end=True)
+                self._deliver(utterance)
+            if self.endpointer.speech_started:
+                self._stream_frames(self.endpointer.frames)
+            if not utterances and not self.endpointer.speech_started \
+                    and timestamps[-1] - listen_start >= self.NO_SPEECH_TIMEOUT:
+                print("请你提出问题？😾")
+                listen_start = timestamps[-1]
+
+    def _on_endpoint_event(self, kind, timestamp):
+        """端点检测事件：语音开始 / 语音结束"""
+        if kind == "endpoint":
+            self.last_endpoint_time = timestamp
+            print('*'*10,"语音结束🙊",'*'*10)
+
+    def _stream_frames(self, frames, end=False):
+        """把尚未发送的语音帧交给流式识别（从端点检测线程调用）"""
+        sink = self._stream_queue
+        if sink is None:
+            return
+        for frame in frames[self._streamed:]:
+            self._loop.call_soon_threadsafe(sink.put_nowait, frame)
+        self._streamed = len(frames)
+        if end:
+            self._loop.call_soon_threadsafe(sink.put_nowait, None)
+            self._stream_queue = None
+            self._streamed = 0
+
+    def _deliver(self, utterance):
+        """把完整语音交给等待方"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_utterances.put_nowait, utterance)
         else:
-            print("没有录到语音")
-        
+            self._utterances.put(utterance)
+
+    def listen(self):
+        """开始聆听下一句话，丢弃之前录到的语音（例如TTS播放期间的回声）"""
+        self.listening.clear()
+        self.flush()
+        self._listen_from = time.time()
+        self.listening.set()
+
+    def flush(self):
+        """丢弃尚未取走的语音"""
+        while not self._utterances.empty():
+            self._utterances.get_nowait()
+        if self._async_utterances is not None:
+            while not self._async_utterances.empty():
+                self._async_utterances.get_nowait()
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._async_utterances = asyncio.Queue()
+
+    async def next_utterance(self):
+        """异步等待下一句完整语音，不阻塞事件循环"""
+        self._bind_loop()
+        if not self.listening.is_set():
+            self.listen()
+        return await self._async_utterances.get()
+
+    async def utterances(self):
+        """异步生成器：连续聆听，逐句产出完整语音，两句之间的音频不会丢失"""
+        self.continuous = True
+        try:
+            while self.running:
+                yield await self.next_utterance()
+        finally:
+            self.continuous = False
+            self.listening.clear()
+
+    async def transcribe(self, utterance):
+        """把一句语音交给识别后端"""
+        if utterance is None or utterance.num_bytes == 0:
+            return {'err_no': 3301, 'err_msg': '没有录到语音', 'result': []}
+        print(f"上传 {utterance.num_bytes} 个字节到{self.backend.name}🪰 (端点等待 {utterance.endpoint_latency:.2f}s, "
+              f"说完到请求 {time.time() - utterance.end_time:.2f}s)")
+        start = time.perf_counter()
+        upload = asyncio.create_task(self.requester.transcribe(utterance.frames, self.RATE))
+        if self.spotter is not None:
+            # 本地指令匹配和上传同时进行：匹配上就取消上传，匹配不上也不耽误云端识别
+            try:
+                command = await asyncio.to_thread(self.spotter.match_command, utterance.frames, utterance.duration)
+            except Exception as e:
+                print(f"本地指令识别出错: {e}")
+                command = None
+            except BaseException:
+                upload.cancel()
+                raise
+            if command:
+                upload.cancel()
+                print(f"本地识别到指令: {command}")
+                return {'err_no': 0, 'err_msg': 'local', 'result': [command]}
+        result = await upload
+        print(f"识别耗时 {time.perf_counter() - start:.2f}s")
+        if result['err_no'] != 0:
+            print("❌ 识别失败:", result['err_msg'], "错误码:", result['err_no'])
         return result
 
+    def recognize(self, utterance):
+        """同步识别一句语音"""
+        return asyncio.run(self.transcribe(utterance))
+
+    async def recognize_async(self):
+        """等待下一句话并识别，不阻塞事件循环"""
+        utterance = await self.next_utterance()
+        return await self.transcribe(utterance)
+
+    async def wait_for_wake_word(self, timeout=None):
+        """待机直到听到唤醒词；没有本地关键词检测时直接返回True"""
+        if self.spotter is None:
+            return True
+        self.listening.clear()
+        print("💤 待机中，说唤醒词继续：", "、".join(self.spotter.wake_words))
+        return await self.spotter.wait_for_wake_word(timeout)
+
+    async def recognize_streaming(self, on_partial=None):
+        """流式识别下一句话：说话时就上传音频，on_partial(中间结果, 稳定前缀) 在收到中间结果时调用
+
+        连接在开口之前建立；流式识别出错时用已录好的整句语音走普通识别
+        """
+        if self.streamer is None:
+            return await self.recognize_async()
+        try:
+            session = await self.streamer.open(on_partial)
+        except Exception as e:
+            print(f"流式识别连接失败，改用整句识别: {e}")
+            return await self.recognize_async()
+
+        self._bind_loop()
+        frames = asyncio.Queue()
+        self._streamed = 0
+        self._stream_queue = frames
+        pump = asyncio.create_task(self._pump(session, frames))
+        utterance = None
+        try:
+            utterance = await self.next_utterance()
+            await pump
+            result = await session.finish()
+            print(f"流式识别: 说完到最终结果 {time.time() - utterance.end_time:.2f}s")
+            if result['err_no'] != 0 and result['err_no'] not in CLIENT_ERRORS:
+                raise RuntimeError(result['err_msg'])
+            return result
+        except Exception as e:
+            if utterance is None:
+                raise
+            print(f"流式识别出错，改用整句识别: {e}")
+            await session.cancel()
+            return await self.transcribe(utterance)
+        finally:
+            self._stream_queue = None
+            pump.cancel()
+
+    @staticmethod
+    async def _pump(session, frames):
+        while True:
+            frame = await frames.get()
+            if frame is None:
+                return
+            await session.send(frame)
+
+    def real_time_recognition(self):
+        """实时语音识别（同步接口，阻塞直到识别出一句话）"""
+        # print('*'*40,"可以说话咯😁","*"*40)
+        self._loop = None
+        self.listen()
+        utterance = self._utterances.get()
+        return self.recognize(utterance)
+
     def stop_recording(self):
-        """关闭音频流"""
-        self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
+        """取消麦克风订阅，没有其他使用者时关闭音频流"""
+        self.running = False
+        self.listening.clear()
+        if self.endpoint_thread and self.endpoint_thread.is_alive():
+            self.endpoint_thread.join(timeout=1.0)
+        self.subscription.close()
+        self.hub.release()
         print("音频流已关闭‼️")
     def main(self):
         try:
@@ -105,4 +293,4 @@ class ASRhelper:
 
 if __name__ == '__main__':
     assistant = ASRhelper()
-    assistant.main()
\ No newline at end of file
+    assistant.main()
@@ -0,0 +1,68 @@
+import threading
+
+
+class AudioRingBuffer:
+    """预分配的环形音频缓冲区，单写多读
+
+    采集线程按帧写入，读取方各自保存读取序号；读取方落后超过容量时旧帧已被覆盖，计为溢出
+    """
+
+    def __init__(self, capacity, frame_bytes):
+        self.capacity = capacity  # 可保存的帧数
+        self.frame_bytes = frame_bytes
+        self._buffer = bytearray(capacity * frame_bytes)
+        self._view = memoryview(self._buffer)
+        self._timestamps = [0.0] * capacity
+        self._cond = threading.Condition()
+        self.write_seq = 0  # 下一帧的序号
+        self.overruns = 0  # 读取方因落后而丢失的帧
+        self.closed = False
+
+    def write(self, frame, timestamp):
+        """写入一帧（长度必须等于 frame_bytes）"""
+        with self._cond:
+            slot = self.write_seq % self.capacity
+            start = slot * self.frame_bytes
+            self._view[start:start + self.frame_bytes] = frame
+            self._timestamps[slot] = timestamp
+            self.write_seq += 1
+            self._cond.notify_all()
+
+    def read(self, seq, timeout=None):
+        """读取序号为 seq 的帧，返回 (下一个序号, 帧的memoryview, 时间戳)
+
+        帧尚未写入时等待；seq 已被覆盖时跳到最旧的可用帧；超时或缓冲区关闭时帧为None。
+        返回的memoryview指向缓冲区内部，需在该槽位被覆盖前使用或复制
+        """
+        seq, view, timestamps = self.read_block(seq, 1, timeout)
+        return seq, view, timestamps[0] if view is not None else None
+
+    def read_block(self, seq, max_frames, timeout=None):
+        """从 seq 开始读取已写入的连续多帧，返回 (下一个序号, 整块的memoryview, [时间戳])
+
+        至少有一帧时立即返回，不等待凑满 max_frames；块不会跨越缓冲区末尾
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: seq < self.write_seq or self.closed, timeout):
+                return seq, None, None
+            if seq >= self.write_seq:
+                return seq, None, None
+            oldest = self.write_seq - self.capacity
+            if seq < oldest:
+                self.overruns += oldest - seq
+                seq = oldest
+            slot = seq % self.capacity
+            n = min(max_frames, self.write_seq - seq, self.capacity - slot)
+            start = slot * self.frame_bytes
+            return (seq + n, self._view[start:start + n * self.frame_bytes],
+                    self._timestamps[slot:slot + n])
+
+    def latest_seq(self):
+        """当前最新的写入位置，新的读取方从这里开始读"""
+        with self._cond:
+            return self.write_seq
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
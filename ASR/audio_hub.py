@@ -0,0 +1,214 @@
+import sys
+import os
+sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
+import time
+import wave
+import logging
+import threading
+import pyaudio
+from ASR.audio_buffer import AudioRingBuffer
+
+
+class Subscription:
+    """麦克风的一个订阅者，有自己的读取位置，读到的是共享缓冲区的memoryview（零拷贝）"""
+
+    def __init__(self, hub, name):
+        self.hub = hub
+        self.name = name
+        self.seq = hub.ring.latest_seq()
+        self.frames_read = 0
+        self.dropped_frames = 0  # 读取太慢被覆盖的帧
+
+    def seek_latest(self):
+        """跳到最新位置，丢弃之前未读的音频"""
+        self.seq = self.hub.ring.latest_seq()
+
+    def read(self, timeout=None):
+        """读取下一帧，返回 (memoryview, 采集时间)；超时或麦克风关闭时返回 (None, None)"""
+        next_seq, frame, timestamp = self.hub.ring.read(self.seq, timeout)
+        if frame is None:
+            return None, None
+        skipped = next_seq - 1 - self.seq
+        if skipped > 0:
+            self.dropped_frames += skipped
+        self.seq = next_seq
+        self.frames_read += 1
+        return frame, timestamp
+
+    def read_block(self, max_frames, timeout=None):
+        """读取当前可用的连续多帧（最多 max_frames），返回 (整块的memoryview, [时间戳])"""
+        next_seq, block, timestamps = self.hub.ring.read_block(self.seq, max_frames, timeout)
+        if block is None:
+            return None, None
+        skipped = next_seq - len(timestamps) - self.seq
+        if skipped > 0:
+            self.dropped_frames += skipped
+        self.seq = next_seq
+        self.frames_read += len(timestamps)
+        return block, timestamps
+
+    @property
+    def closed(self):
+        return self.hub.ring.closed
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class MicrophoneHub:
+    """统一的麦克风采集中心：独占输入设备，把每帧分发给所有订阅者（端点检测、打断检测、录音等）"""
+
+    def __init__(self, rate=16000, frame_ms=20, channels=1, ring_seconds=10, device_index=None):
+        self.RATE = rate
+        self.CHANNELS = channels
+        self.FORMAT = pyaudio.paInt16
+        self.CHUNK = rate * frame_ms // 1000  # 每帧采样数，webrtcvad 要求 10/20/30ms
+        self.frame_bytes = self.CHUNK * 2 * channels
+        self.device_index = device_index
+        self.ring = AudioRingBuffer(ring_seconds * 1000 // frame_ms, self.frame_bytes)
+
+        self.p = None
+        self.stream = None
+        self.running = False
+        self.subscribers = []
+        self._lock = threading.Lock()
+        self._users = 0
+        self.device_overruns = 0  # 设备报告输入溢出的次数（回调没跟上，设备丢了采样）
+        self.captured_frames = 0
+
+    def acquire(self):
+        """登记一个使用者，第一个使用者到来时打开设备"""
+        with self._lock:
+            self._users += 1
+            if not self.running:
+                self._start()
+        return self
+
+    def release(self):
+        """注销一个使用者，最后一个使用者离开时关闭设备"""
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users == 0 and self.running:
+                self._stop()
+
+    def _start(self):
+        if self.ring.closed:
+            self.ring = AudioRingBuffer(self.ring.capacity, self.frame_bytes)
+        self.p = pyaudio.PyAudio()
+        self.running = True
+        # 回调模式：PortAudio 的采集线程每收到一帧就调用 _on_audio，溢出从 status_flags 得知，不会丢掉已读到的音频
+        self.stream = self.p.open(format=self.FORMAT,
+                                  channels=self.CHANNELS,
+                                  rate=self.RATE,
+                                  input=True,
+                                  input_device_index=self.device_index,
+                                  frames_per_buffer=self.CHUNK,
+                                  stream_callback=self._on_audio)
+        logging.info(f"麦克风已打开: {self.RATE}Hz, 每帧 {self.CHUNK} 个采样")
+
+    def _on_audio(self, in_data, frame_count, time_info, status_flags):
+        """采集回调：把一帧写入环形缓冲区；设备报告输入溢出时只计数，这一帧照常保留"""
+        if status_flags & pyaudio.paInputOverflow:
+            self.device_overruns += 1
+        if not self.running:
+            return None, pyaudio.paComplete
+        self.ring.write(in_data, time.time())
+        self.captured_frames += 1
+        return None, pyaudio.paContinue
+
+    def _stop(self):
+        self.running = False
+        try:
+            self.stream.stop_stream()
+            self.stream.close()
+        finally:
+            self.p.terminate()
+            self.stream = None
+            self.p = None
+            self.ring.close()
+        logging.info("麦克风已关闭")
+
+    def subscribe(self, name):
+        """新增一个订阅者，从当前时刻开始读取"""
+        sub = Subscription(self, name)
+        with self._lock:
+            self.subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self.subscribers:
+                self.subscribers.remove(sub)
+
+    def stats(self):
+        """采集统计：设备溢出次数和每个订阅者的丢帧数"""
+        return {
+            "captured_frames": self.captured_frames,
+            "device_overruns": self.device_overruns,
+            "subscribers": {s.name: {"frames_read": s.frames_read, "dropped_frames": s.dropped_frames}
+                            for s in self.subscribers},
+        }
+
+
+class WavRecorder:
+    """录音订阅者：把麦克风音频写入WAV文件，可用于录制测试音频"""
+
+    def __init__(self, hub, path):
+        self.hub = hub
+        self.path = path
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.hub.acquire()
+        self.sub = self.hub.subscribe("recorder")
+        self.running = True
+        self.thread = threading.Thread(target=self._record_loop, daemon=True)
+        self.thread.start()
+
+    def _record_loop(self):
+        with wave.open(self.path, "wb") as wf:
+            wf.setnchannels(self.hub.CHANNELS)
+            wf.setsampwidth(2)
+            wf.setframerate(self.hub.RATE)
+            while self.running:
+                frame, _ = self.sub.read(timeout=0.5)
+                if frame is None:
+                    if self.sub.closed:
+                        break
+                    continue
+                wf.writeframesraw(frame)
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        self.sub.close()
+        self.hub.release()
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_microphone_hub():
+    """进程内共享的麦克风采集中心"""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = MicrophoneHub()
+        return _hub
+
+
+if __name__ == "__main__":
+    # 录制一段音频：python ASR/audio_hub.py out.wav 10
+    path = sys.argv[1] if len(sys.argv) > 1 else "record.wav"
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    hub = get_microphone_hub()
+    recorder = WavRecorder(hub, path)
+    recorder.start()
+    print(f"正在录音 {seconds} 秒 -> {path}")
+    time.sleep(seconds)
+    stats = hub.stats()
+    recorder.stop()
+    print(stats)
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import logging
+import threading
+import collections
+import numpy as np
+from ASR.encoder import AudioEncoder
+
+try:
+    from aip import AipSpeech
+except ImportError:  # 只用本地识别时可以不装百度SDK
+    AipSpeech = None
+
+try:
+    import vosk
+except ImportError:  # 本地识别是可选依赖：pip install vosk
+    vosk = None
+
+
+class BackendMetrics:
+    """识别后端的统一计时统计"""
+
+    def __init__(self, window=200):
+        self.requests = 0
+        self.failures = 0
+        self.bytes_sent = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.encode_seconds = 0.0  # 上传前压缩音频的耗时
+        self.latencies = collections.deque(maxlen=window)  # 最近若干次请求的耗时
+        self._lock = threading.Lock()
+
+    def record(self, latency, audio_seconds, num_bytes, ok):
+        with self._lock:
+            self.requests += 1
+            self.failures += 0 if ok else 1
+            self.bytes_sent += num_bytes
+            self.audio_seconds += audio_seconds
+            self.busy_seconds += latency
+            self.latencies.append(latency)
+
+    def record_encode(self, seconds):
+        with self._lock:
+            self.encode_seconds += seconds
+
+    def percentile(self, q):
+        with self._lock:
+            if not self.latencies:
+                return None
+            return float(np.percentile(self.latencies, q))
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "bytes_sent": self.bytes_sent,
+            "encode_seconds": self.encode_seconds,
+            "latency_p50": self.percentile(50),
+            "latency_p95": self.percentile(95),
+            # 实时率：识别耗时 / 音频时长，越小越好
+            "rtf": self.busy_seconds / self.audio_seconds if self.audio_seconds else None,
+        }
+
+
+class ASRBackend:
+    """语音识别后端基类
+
+    transcribe 接收16位单声道PCM（整段字节或按帧的列表），返回与百度接口相同格式的结果：
+    {'err_no': 0, 'err_msg': ..., 'result': [文本]}，出错时 err_no 非0。
+    子类实现 _transcribe(帧列表, 采样率)，返回 (结果, 实际发送的字节数)
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.metrics = BackendMetrics()
+        self.last_latency = None
+
+    def _transcribe(self, audio, rate):
+        raise NotImplementedError
+
+    def transcribe(self, audio, rate=16000):
+        frames = [audio] if isinstance(audio, (bytes, bytearray, memoryview)) else audio
+        pcm_bytes = sum(len(f) for f in frames)
+        start = time.perf_counter()
+        try:
+            result, wire_bytes = self._transcribe(frames, rate)
+        except Exception as e:
+            logging.error(f"{self.name} 识别出错: {e}")
+            result, wire_bytes = {'err_no': -1, 'err_msg': str(e), 'result': []}, 0
+        self.last_latency = time.perf_counter() - start
+        self.metrics.record(self.last_latency, pcm_bytes / 2 / rate, wire_bytes, result.get('err_no') == 0)
+        return result
+
+
+class BaiduBackend(ASRBackend):
+    """百度短语音识别（云端），凭据从环境变量读取
+
+    upload_format 为 m4a / amr 时先用 ffmpeg 压缩再上传（环境变量 BAIDU_UPLOAD_FORMAT），默认上传PCM
+    """
+
+    name = "baidu"
+
+    def __init__(self, app_id=None, api_key=None, secret_key=None, dev_pid=1537, timeout=3.0,
+                 upload_format=None):
+        super().__init__()
+        if AipSpeech is None:
+            raise ImportError("百度识别需要安装 baidu-aip")
+        self.client = AipSpeech(app_id or os.environ.get("BAIDU_APP_ID", ""),
+                                api_key or os.environ.get("BAIDU_API_KEY", ""),
+                                secret_key or os.environ.get("BAIDU_SECRET_KEY", ""))
+        # 限制HTTP超时，被上层放弃的请求也不会长时间占着线程
+        self.client.setConnectionTimeoutInMillis(int(timeout * 1000))
+        self.client.setSocketTimeoutInMillis(int(timeout * 1000))
+        self.dev_pid = dev_pid  # 1537: 普通话
+        upload_format = upload_format or os.environ.get("BAIDU_UPLOAD_FORMAT", "pcm")
+        self.encoder = AudioEncoder(upload_format) if upload_format != "pcm" else None
+
+    def _transcribe(self, frames, rate):
+        pcm_bytes = sum(len(f) for f in frames)
+        data, fmt = None, 'pcm'
+        if self.encoder is not None:
+            try:
+                data, encode_time = self.encoder.encode(frames, rate)
+                fmt = self.encoder.format
+                self.metrics.record_encode(encode_time)
+                logging.info(f"压缩上传: {pcm_bytes} -> {len(data)} 字节 ({fmt})，编码耗时 {encode_time * 1000:.0f}ms")
+            except Exception as e:
+                logging.error(f"音频压缩失败，改为上传PCM: {e}")
+        if data is None:
+            data = frames[0] if len(frames) == 1 else b"".join(frames)
+            logging.info(f"上传PCM: {len(data)} 字节")
+        return self.client.asr(data, fmt, rate, {'dev_pid': self.dev_pid}), len(data)
+
+
+_vosk_models = {}
+_vosk_lock = threading.Lock()
+
+
+def load_vosk_model(model_path=None):
+    """加载Vosk模型，同一路径只加载一次（识别后端和关键词检测共用）"""
+    if vosk is None:
+        raise ImportError("本地识别需要安装 vosk")
+    model_path = model_path or os.environ.get("VOSK_MODEL", "models/vosk-model-small-cn-0.22")
+    with _vosk_lock:
+        if model_path not in _vosk_models:
+            vosk.SetLogLevel(-1)
+            _vosk_models[model_path] = vosk.Model(model_path)
+            logging.info(f"Vosk模型已加载: {model_path}")
+        return _vosk_models[model_path]
+
+
+class VoskBackend(ASRBackend):
+    """Vosk 本地离线识别（CPU），模型常驻内存"""
+
+    name = "vosk"
+
+    def __init__(self, model_path=None):
+        super().__init__()
+        self.model = load_vosk_model(model_path)
+
+    def _transcribe(self, frames, rate):
+        recognizer = vosk.KaldiRecognizer(self.model, rate)
+        for frame in frames:
+            recognizer.AcceptWaveform(bytes(frame))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        text = text.replace(" ", "")  # 中文模型按字输出，中间有空格
+        if not text:
+            return {'err_no': 3301, 'err_msg': 'speech quality error.', 'result': []}, 0
+        return {'err_no': 0, 'err_msg': 'success.', 'result': [text]}, 0
+
+
+class StandInBackend(ASRBackend):
+    """替身后端：不联网、不加载模型，返回固定文本，可模拟延迟，用于测试"""
+
+    name = "standin"
+
+    def __init__(self, text="甘薯怎么种", latency=0.0):
+        super().__init__()
+        self.text = text
+        self.latency = latency
+
+    def _transcribe(self, frames, rate):
+        if self.latency:
+            time.sleep(self.latency)
+        wire_bytes = sum(len(f) for f in frames)
+        if not self.text:
+            return {'err_no': 3301, 'err_msg': 'speech quality error.', 'result': []}, wire_bytes
+        return {'err_no': 0, 'err_msg': 'success.', 'result': [self.text]}, wire_bytes
+
+
+BACKENDS = {
+    BaiduBackend.name: BaiduBackend,
+    VoskBackend.name: VoskBackend,
+    StandInBackend.name: StandInBackend,
+}
+
+
+def create_backend(name=None, **kwargs):
+    """按名称创建识别后端，默认读取环境变量 ASR_BACKEND（baidu / vosk / standin）"""
+    name = name or os.environ.get("ASR_BACKEND", "baidu")
+    if name not in BACKENDS:
+        raise ValueError(f"未知的识别后端: {name}，可选: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+_backend = None
+_fallbacks = None
+_backend_lock = threading.Lock()
+
+
+def get_asr_backend():
+    """进程内共享的识别后端，避免本地模型重复加载"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def get_fallback_backends():
+    """主后端熔断时使用的备用后端，由环境变量 ASR_FALLBACK 指定（逗号分隔，例如 vosk）"""
+    global _fallbacks
+    with _backend_lock:
+        if _fallbacks is None:
+            names = [n.strip() for n in os.environ.get("ASR_FALLBACK", "").split(",") if n.strip()]
+            _fallbacks = []
+            for name in names:
+                try:
+                    _fallbacks.append(create_backend(name))
+                except Exception as e:
+                    logging.error(f"备用识别后端 {name} 不可用: {e}")
+        return _fallbacks
+
+
+if __name__ == "__main__":
+    # 比较各后端的识别结果和耗时：python ASR/backends.py a.wav b.wav --backends baidu,vosk
+    import sys
+    import argparse
+    sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
+    from ASR.replay import load_fixture
+
+    parser = argparse.ArgumentParser(description="比较识别后端的延迟")
+    parser.add_argument("fixtures", nargs="+", help="16kHz 16位单声道 WAV/PCM 录音，每个文件作为一句话")
+    parser.add_argument("--backends", default="baidu,vosk")
+    args = parser.parse_args()
+
+    for name in args.backends.split(","):
+        backend = create_backend(name)
+        for path in args.fixtures:
+            result = backend.transcribe(load_fixture(path))
+            print(f"[{name}] {os.path.basename(path)}: {result.get('result') or result.get('err_msg')} "
+                  f"({backend.last_latency:.2f}s)")
+        print(f"[{name}] {backend.metrics.summary()}")
@@ -0,0 +1,45 @@
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+
+
+class AudioEncoder:
+    """用 ffmpeg 把PCM帧压缩成百度接受的格式（m4a / amr），逐帧写入ffmpeg，不拼接整段音频"""
+
+    CODECS = {
+        "m4a": ["-c:a", "aac", "-f", "ipod"],  # mp4 容器需要可寻址的输出，写临时文件
+        "amr": ["-c:a", "libvo_amrwbenc", "-f", "amr"],  # 16kHz 对应 AMR-WB
+    }
+    DEFAULT_BITRATE = {"m4a": "32k", "amr": "23.85k"}
+
+    def __init__(self, fmt="m4a", bitrate=None, ffmpeg="ffmpeg"):
+        if fmt not in self.CODECS:
+            raise ValueError(f"不支持的压缩格式: {fmt}，可选: {', '.join(self.CODECS)}")
+        self.ffmpeg = shutil.which(ffmpeg)
+        if self.ffmpeg is None:
+            raise FileNotFoundError("压缩上传需要安装 ffmpeg")
+        self.format = fmt
+        self.bitrate = bitrate or self.DEFAULT_BITRATE[fmt]
+
+    def encode(self, frames, rate=16000, channels=1):
+        """压缩一组PCM帧，返回 (压缩后的字节, 编码耗时)"""
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, f"speech.{self.format}")
+            cmd = [self.ffmpeg, "-hide_banner", "-loglevel", "error",
+                   "-f", "s16le", "-ar", str(rate), "-ac", str(channels), "-i", "pipe:0",
+                   *self.CODECS[self.format], "-b:a", self.bitrate, "-y", output]
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE)
+            try:
+                proc.stdin.writelines(frames)
+            except BrokenPipeError:
+                pass  # ffmpeg 提前退出，错误信息从 stderr 读取
+            _, err = proc.communicate()
+            if proc.returncode != 0:
+                raise RuntimeError(f"ffmpeg 编码失败: {err.decode(errors='ignore').strip()}")
+            with open(output, "rb") as f:
+                data = f.read()
+        return data, time.perf_counter() - start
@@ -0,0 +1,197 @@
+import collections
+import numpy as np
+
+
+def block_rms(block, n_frames):
+    """一块连续16位PCM帧中每帧的均方根能量（不复制数据）"""
+    frames = np.frombuffer(block, dtype=np.int16).reshape(n_frames, -1)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / frames.shape[1])
+
+
+class Utterance:
+    """一段完整的语音：按帧保存，需要时再拼接"""
+
+    def __init__(self, frames, start_time, end_time, endpoint_time, reason):
+        self.frames = frames  # [bytes]，每帧一个元素，包含开头的预录音和结尾的拖尾
+        self.start_time = start_time  # 第一帧语音的采集时间
+        self.end_time = end_time  # 最后一帧语音的采集时间
+        self.endpoint_time = endpoint_time  # 判定语音结束的时间
+        self.reason = reason  # "silence" 或 "max_duration"
+
+    @property
+    def audio(self):
+        return b"".join(self.frames)
+
+    @property
+    def num_bytes(self):
+        return sum(len(f) for f in self.frames)
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    @property
+    def endpoint_latency(self):
+        """说完最后一个字到判定结束之间等待的时间"""
+        return self.endpoint_time - self.end_time
+
+
+class Endpointer:
+    """VAD端点检测：逐帧输入音频，检测到一句话说完时返回 Utterance
+
+    - 预录音：未开始说话时保留最近一小段音频，语音开始后拼在最前面，避免吞掉第一个字
+    - 平滑：对最近几帧的VAD结果做多数表决，连续若干帧语音才算开始说话，偶尔一帧误判不影响结果
+    - 自适应静音阈值：根据说话人句中停顿的长短调整判定结束所需的静音时长，噪声大时适当延长
+    - 事件：语音开始和结束时调用 on_event(类型, 时间戳)，类型为 "speech_start" 或 "endpoint"
+    - 预筛选：设置 gate（EnergyGate）后只有通过能量预筛选的帧才调用VAD
+    """
+
+    def __init__(self, vad, rate=16000, silence_duration=0.5, max_duration=15.0,
+                 preroll_duration=0.3, tail_duration=0.2, smooth_frames=5, onset_frames=3,
+                 min_silence=0.3, max_silence=1.0, pause_factor=1.5,
+                 noise_snr=3.0, noise_extra=0.2, on_event=None, gate=None):
+        self.vad = vad
+        self.gate = gate
+        self.rate = rate
+        self.silence_duration = silence_duration  # 还没有停顿统计时使用的静音阈值
+        self.max_duration = max_duration  # 单句最长录音时间
+        self.preroll_duration = preroll_duration
+        self.tail_duration = tail_duration  # 结尾保留的静音时长
+        self.smooth_frames = smooth_frames
+        self.onset_frames = onset_frames  # 平滑窗口内至少这么多帧语音才算开始说话
+        self.min_silence = min_silence
+        self.max_silence = max_silence
+        self.pause_factor = pause_factor  # 静音阈值 = 句中平均停顿 × 该系数
+        self.noise_snr = noise_snr  # 语音能量低于噪声的这个倍数时认为环境嘈杂
+        self.noise_extra = noise_extra  # 嘈杂环境下额外增加的静音时长
+        self.on_event = on_event
+
+        # 跨句保留的自适应统计
+        self.pause_ema = None  # 句中停顿时长的指数平均
+        self.noise_level = None  # 非语音帧的能量
+        self.speech_level = None  # 语音帧的能量
+        self._frame_duration = None  # 由第一块音频确定
+        self.reset()
+
+    def reset(self):
+        """开始新的一句，自适应统计保留"""
+        self.frames = []
+        self.speech_started = False
+        self.start_time = None
+        self.last_speech_time = None
+        self._last_speech_index = 0
+        self._window = collections.deque(maxlen=self.smooth_frames)  # (是否语音, 时间戳)
+        self._preroll = collections.deque()
+
+    def reset_adaptation(self):
+        """清除自适应统计，例如换了一个说话人"""
+        self.pause_ema = None
+        self.noise_level = None
+        self.speech_level = None
+
+    def silence_threshold(self):
+        """当前判定语音结束所需的静音时长"""
+        if self.pause_ema is None:
+            threshold = self.silence_duration
+        else:
+            threshold = self.pause_factor * self.pause_ema
+        if self.noise_level and self.speech_level and self.speech_level < self.noise_snr * self.noise_level:
+            threshold += self.noise_extra
+        return min(max(threshold, self.min_silence), self.max_silence)
+
+    def _emit(self, kind, timestamp):
+        if self.on_event is not None:
+            self.on_event(kind, timestamp)
+
+    @staticmethod
+    def _ema(old, value, alpha):
+        return value if old is None else (1 - alpha) * old + alpha * value
+
+    def process(self, frame, timestamp):
+        """输入一帧及其采集时间，语音结束时返回 Utterance，否则返回None"""
+        utterances = self.process_block(frame, [timestamp])
+        return utterances[0] if utterances else None
+
+    def process_block(self, block, timestamps):
+        """输入连续多帧及每帧的采集时间，返回这段音频中结束的 Utterance 列表"""
+        n = len(timestamps)
+        frame_bytes = len(block) // n
+        if self._frame_duration is None:
+            self._frame_duration = frame_bytes / 2 / self.rate
+        if self.gate is not None:
+            candidates, rms = self.gate.process_block(block, n)
+        else:
+            candidates, rms = None, block_rms(block, n)
+
+        if candidates is not None and not self.speech_started and not candidates.any():
+            # 安静的块：不逐帧处理，只更新平滑窗口、预录音和噪声能量
+            self._window.extend((False, t) for t in timestamps[-self.smooth_frames:])
+            keep = max(1, int(self.preroll_duration / self._frame_duration))
+            for i in range(max(0, n - keep), n):
+                self._preroll.append(bytes(block[i * frame_bytes:(i + 1) * frame_bytes]))
+            while len(self._preroll) > keep:
+                self._preroll.popleft()
+            self.noise_level = self._ema(self.noise_level, float(rms.mean()), 1 - 0.95 ** n)
+            return []
+
+        utterances = []
+        for i, timestamp in enumerate(timestamps):
+            frame = block[i * frame_bytes:(i + 1) * frame_bytes]
+            raw_speech = (candidates is None or candidates[i]) and self.vad.is_speech(frame, self.rate)
+            utterance = self._step(frame, timestamp, raw_speech, rms[i])
+            if utterance is not None:
+                utterances.append(utterance)
+        return utterances
+
+    def _step(self, frame, timestamp, raw_speech, rms):
+        self._window.append((raw_speech, timestamp))
+        voiced = sum(1 for s, _ in self._window if s)
+
+        if not self.speech_started:
+            self._preroll.append(bytes(frame))
+            if len(self._preroll) * self._frame_duration > self.preroll_duration:
+                self._preroll.popleft()
+            if not raw_speech:
+                self.noise_level = self._ema(self.noise_level, rms, 0.05)
+            if voiced >= self.onset_frames:
+                self.speech_started = True
+                self.start_time = next(t for s, t in self._window if s)
+                self.last_speech_time = timestamp
+                self.frames = list(self._preroll)
+                self._preroll.clear()
+                self._last_speech_index = len(self.frames)
+                self._emit("speech_start", self.start_time)
+            return None
+
+        self.frames.append(bytes(frame))
+        if voiced * 2 > len(self._window):
+            # 平滑后仍是语音；中间有过静音则记为一次句中停顿
+            pause = timestamp - self.last_speech_time - self._frame_duration
+            if pause > self._frame_duration:
+                self.pause_ema = self._ema(self.pause_ema, pause, 0.3)
+            self.last_speech_time = timestamp
+            self._last_speech_index = len(self.frames)
+            self.speech_level = self._ema(self.speech_level, rms, 0.1)
+        else:
+            if not raw_speech:
+                self.noise_level = self._ema(self.noise_level, rms, 0.05)
+            if timestamp - self.last_speech_time >= self.silence_threshold():
+                return self._finish(timestamp, "silence")
+
+        if timestamp - self.start_time >= self.max_duration:
+            return self._finish(timestamp, "max_duration")
+        return None
+
+    def flush(self, timestamp, reason="end_of_audio"):
+        """输入结束时强制结束正在进行的语音，没有语音时返回None"""
+        if not self.speech_started:
+            return None
+        return self._finish(timestamp, reason)
+
+    def _finish(self, timestamp, reason):
+        tail = int(round(self.tail_duration / self._frame_duration))
+        frames = self.frames[:self._last_speech_index + tail]
+        utterance = Utterance(frames, self.start_time, self.last_speech_time, timestamp, reason)
+        self._emit("endpoint", timestamp)
+        self.reset()
+        return utterance
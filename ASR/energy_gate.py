@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class EnergyGate:
+    """webrtcvad 之前的能量/过零率预筛选
+
+    按块处理多帧16位PCM音频：能量明显高于噪声底的帧，或能量略高且过零率像清辅音的帧，
+    才交给VAD判断。噪声底由未通过的帧持续估计，安静房间里绝大多数帧不会调用VAD
+    """
+
+    def __init__(self, rate=16000, frame_ms=20, ratio=3.0, min_rms=100.0,
+                 fricative_ratio=1.5, zcr_range=(0.15, 0.5), noise_alpha=0.1, creep=1.05):
+        self.frame_samples = rate * frame_ms // 1000
+        self.ratio = ratio  # 能量超过噪声底的倍数
+        self.min_rms = min_rms  # 绝对能量下限，避免在极安静时噪声底过低
+        self.fricative_ratio = fricative_ratio  # 清辅音（s、sh等）能量低但过零率高
+        self.zcr_range = zcr_range
+        self.noise_alpha = noise_alpha
+        self.creep = creep  # 整块都通过时噪声底缓慢上调，适应持续变大的噪声
+        self.noise_floor = None  # 噪声底（RMS）
+        self.block_floor = None  # 最近一块的噪声底估计
+        self.frames_total = 0
+        self.frames_passed = 0
+
+    def threshold(self):
+        floor = self.noise_floor or 0.0
+        return max(self.min_rms, self.ratio * floor)
+
+    def process_block(self, block, n_frames=None):
+        """处理一块连续的帧，返回 (每帧是否需要VAD判断, 每帧RMS)，两者都是numpy数组"""
+        samples = np.frombuffer(block, dtype=np.int16)  # 直接引用原缓冲区，不复制
+        if n_frames is None:
+            n_frames = samples.size // self.frame_samples
+        frames = samples[:n_frames * self.frame_samples].reshape(n_frames, self.frame_samples)
+
+        energy = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / self.frame_samples
+        rms = np.sqrt(energy)
+
+        if self.noise_floor is None:
+            self.noise_floor = float(rms.min())
+        candidates = rms > self.threshold()
+        # 只对能量处在清辅音范围内的帧计算过零率，安静时完全跳过
+        maybe_fricative = ~candidates & (rms > max(self.min_rms, self.fricative_ratio * self.noise_floor))
+        if maybe_fricative.any():
+            idx = np.flatnonzero(maybe_fricative)
+            signs = np.signbit(frames[idx])
+            zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.frame_samples
+            candidates[idx] = (zcr >= self.zcr_range[0]) & (zcr <= self.zcr_range[1])
+
+        quiet = rms[~candidates]
+        if quiet.size:
+            self.block_floor = float(quiet.mean())
+            self.noise_floor += self.noise_alpha * (self.block_floor - self.noise_floor)
+        else:
+            self.block_floor = float(rms.min())
+            self.noise_floor = min(self.noise_floor * self.creep, self.block_floor)
+
+        self.frames_total += n_frames
+        self.frames_passed += int(np.count_nonzero(candidates))
+        return candidates, rms
+
+    @property
+    def pass_rate(self):
+        """需要VAD判断的帧所占比例"""
+        return self.frames_passed / self.frames_total if self.frames_total else 0.0
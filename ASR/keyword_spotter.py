@@ -0,0 +1,133 @@
+import re
+import json
+import asyncio
+import logging
+import threading
+from ASR.audio_hub import get_microphone_hub
+from ASR.energy_gate import EnergyGate
+from ASR.backends import vosk, load_vosk_model
+
+WAKE_WORDS = ["你好甘薯", "甘薯助手"]
+EXIT_PHRASES = ["退出", "退出了", "没有了", "没了", "无", "关闭", "停止", "拜拜", "再见"]
+# 本地识别的控制指令；单字的"无"太容易误识别，只在云端结果里匹配
+COMMAND_PHRASES = [p for p in EXIT_PHRASES if len(p) > 1]
+
+
+def normalize_command(text):
+    """去掉标点和空格，方便与指令表比较"""
+    return re.sub(r"[\s，。！？、,.!?]", "", text or "").lower()
+
+
+def is_exit_command(text):
+    return normalize_command(text) in EXIT_PHRASES
+
+
+class KeywordSpotter:
+    """本地关键词检测：用限定语法的Vosk识别器识别唤醒词和控制指令，不上传云端
+
+    - wait_for_wake_word：待机时订阅麦克风，只把能量预筛选通过的声音送入识别器，听到唤醒词返回
+    - match_command：对一句较短的语音做本地识别，是控制指令时直接返回，省掉一次云端请求
+    """
+
+    def __init__(self, hub=None, model=None, wake_words=WAKE_WORDS, commands=COMMAND_PHRASES,
+                 min_confidence=0.6, max_command_seconds=2.0):
+        if vosk is None:
+            raise ImportError("关键词检测需要安装 vosk")
+        self.hub = hub or get_microphone_hub()
+        self.model = model or load_vosk_model()
+        self.rate = self.hub.RATE
+        self.wake_words = list(wake_words)
+        self.commands = list(commands)
+        self.grammar = json.dumps(self.wake_words + self.commands + ["[unk]"], ensure_ascii=False)
+        self.min_confidence = min_confidence
+        self.max_command_seconds = max_command_seconds  # 更长的语音肯定不是控制指令
+        self.gate = EnergyGate(self.rate, self.hub.CHUNK * 1000 // self.rate)
+        self.armed = threading.Event()
+        self.stats = {"frames_fed": 0, "wake_detections": 0, "commands": 0}
+
+    def _recognizer(self):
+        recognizer = vosk.KaldiRecognizer(self.model, self.rate, self.grammar)
+        recognizer.SetWords(True)
+        return recognizer
+
+    def _parse(self, result_json):
+        """从识别结果中取出关键词，置信度不够或是未知词时返回None"""
+        result = json.loads(result_json)
+        text = result.get("text", "").replace(" ", "")
+        words = result.get("result", [])
+        if not text or "[unk]" in text or not words:
+            return None
+        confidence = sum(w.get("conf", 0.0) for w in words) / len(words)
+        return text if confidence >= self.min_confidence else None
+
+    def match_command(self, frames, duration):
+        """本地识别一句短语音，是控制指令时返回指令文本，否则返回None"""
+        if duration > self.max_command_seconds:
+            return None
+        recognizer = self._recognizer()
+        for frame in frames:
+            recognizer.AcceptWaveform(bytes(frame))
+        phrase = self._parse(recognizer.FinalResult())
+        if phrase in self.commands:
+            self.stats["commands"] += 1
+            return phrase
+        return None
+
+    async def wait_for_wake_word(self, timeout=None):
+        """待机直到听到唤醒词，返回True；超时返回False"""
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+        self.hub.acquire()
+        sub = self.hub.subscribe("kws")
+        self.armed.set()
+        thread = threading.Thread(target=self._spot_loop, args=(sub, loop, woken), daemon=True)
+        thread.start()
+        try:
+            return await asyncio.wait_for(woken, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.armed.clear()
+            await asyncio.to_thread(thread.join, 1.0)
+            sub.close()
+            self.hub.release()
+
+    def _spot_loop(self, sub, loop, woken):
+        recognizer = self._recognizer()
+        frame_bytes = self.hub.frame_bytes
+        hangover_frames = int(0.5 * self.rate / self.hub.CHUNK)  # 声音结束后继续送入0.5秒
+        hangover, fed = 0, False
+        while self.armed.is_set():
+            block, timestamps = sub.read_block(10, timeout=0.5)
+            if block is None:
+                if sub.closed:
+                    break
+                continue
+            candidates, _ = self.gate.process_block(block, len(timestamps))
+            if candidates.any():
+                hangover = hangover_frames
+            elif hangover > 0:
+                hangover -= len(timestamps)
+            else:
+                if fed:
+                    # 一段声音结束，取最终结果后重置识别器
+                    phrase = self._parse(recognizer.FinalResult())
+                    recognizer.Reset()
+                    fed = False
+                    if self._check_wake(phrase, loop, woken):
+                        return
+                continue
+
+            fed = True
+            self.stats["frames_fed"] += len(block) // frame_bytes
+            if recognizer.AcceptWaveform(bytes(block)):
+                if self._check_wake(self._parse(recognizer.Result()), loop, woken):
+                    return
+
+    def _check_wake(self, phrase, loop, woken):
+        if phrase not in self.wake_words:
+            return False
+        self.stats["wake_detections"] += 1
+        logging.info(f"检测到唤醒词: {phrase}")
+        loop.call_soon_threadsafe(lambda: woken.done() or woken.set_result(True))
+        return True
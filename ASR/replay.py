@@ -0,0 +1,208 @@
+import sys
+import os
+sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
+import time
+import wave
+import argparse
+import itertools
+import numpy as np
+import webrtcvad
+from ASR.endpoint import Endpointer
+from ASR.energy_gate import EnergyGate
+from ASR.backends import StandInBackend
+
+
+def load_fixture(path, rate=16000):
+    """读取WAV或裸PCM（16位单声道小端）音频，返回字节串"""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != rate:
+                raise ValueError(f"{path}: 需要 {rate}Hz 16位单声道音频，实际为 "
+                                 f"{wf.getframerate()}Hz {wf.getsampwidth() * 8}位 {wf.getnchannels()}声道")
+            return wf.readframes(wf.getnframes())
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def load_labels(path):
+    """读取Audacity标签文件（每行: 开始秒 结束秒 [文本]），返回 [(开始, 结束, 文本)]；文件不存在返回None"""
+    if not os.path.exists(path):
+        return None
+    segments = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 2 or not parts[0].strip():
+                continue
+            text = parts[2] if len(parts) > 2 else ""
+            segments.append((float(parts[0]), float(parts[1]), text))
+    return segments
+
+
+def labels_path(fixture_path):
+    return os.path.splitext(fixture_path)[0] + ".txt"
+
+
+class LabelledStandIn(StandInBackend):
+    """回放用的替身后端：返回与语音重叠最多的标注文本"""
+
+    name = "standin"
+
+    def __init__(self, segments=None):
+        super().__init__(text="")
+        self.segments = segments or []
+        self.current = None  # 当前识别的语音在录音中的 (开始, 结束)
+
+    def _transcribe(self, frames, rate):
+        wire_bytes = sum(len(f) for f in frames)
+        segment = _best_segment(self.segments, *self.current) if self.current else None
+        if segment is None:
+            return {'err_no': 3301, 'err_msg': 'speech quality error.', 'result': []}, wire_bytes
+        return {'err_no': 0, 'err_msg': 'success.', 'result': [segment[2]]}, wire_bytes
+
+
+def _overlap(a_start, a_end, b_start, b_end):
+    return max(0.0, min(a_end, b_end) - max(a_start, b_start))
+
+
+def _best_segment(segments, start, end):
+    best, best_overlap = None, 0.0
+    for seg in segments:
+        overlap = _overlap(start, end, seg[0], seg[1])
+        if overlap > best_overlap:
+            best, best_overlap = seg, overlap
+    return best
+
+
+def replay(audio, segments=None, rate=16000, frame_ms=20, vad_mode=2, use_gate=True, block_frames=10,
+           **endpointer_kwargs):
+    """把一段录音逐帧送入与 ASRhelper 相同的 VAD 和端点检测，不等待真实时间
+
+    时间戳从0开始按帧长递增，返回 (每句话的结果, 整段录音的统计)
+    """
+    frame_bytes = rate * frame_ms // 1000 * 2
+    frame_duration = frame_ms / 1000
+    gate = EnergyGate(rate, frame_ms) if use_gate else None
+    endpointer = Endpointer(webrtcvad.Vad(vad_mode), rate, gate=gate, **endpointer_kwargs)
+    backend = LabelledStandIn(segments)
+    view = memoryview(audio)
+
+    # 与 ASRhelper 一样按块送入
+    utterances = []
+    n_frames = len(audio) // frame_bytes
+    for first in range(0, n_frames, block_frames):
+        last = min(first + block_frames, n_frames)
+        timestamps = [i * frame_duration for i in range(first, last)]
+        utterances.extend(endpointer.process_block(view[first * frame_bytes:last * frame_bytes], timestamps))
+    # 录音结束时还在说话：按结束处理（真实场景会继续录）
+    utterance = endpointer.flush(n_frames * frame_duration)
+    if utterance is not None:
+        utterances.append(utterance)
+
+    results = []
+    for u in utterances:
+        audio_end = u.end_time + endpointer.tail_duration + frame_duration
+        backend.current = (u.start_time, u.end_time)
+        response = backend.transcribe(u.frames, rate)
+        result = {
+            "start": u.start_time,
+            "end": u.end_time,
+            "endpoint_time": u.endpoint_time,
+            "reason": u.reason,
+            "bytes": u.num_bytes,
+            "endpoint_latency": u.endpoint_latency,
+            "truncated": u.reason == "max_duration",
+            "false_trigger": False,
+            "text": response['result'][0] if response['err_no'] == 0 else None,
+        }
+        if segments is not None:
+            covered = [seg for seg in segments if _overlap(u.start_time, u.end_time, seg[0], seg[1]) > 0]
+            if not covered:
+                result["false_trigger"] = True
+            else:
+                # 有标注时用真实的说话结束时间计算延迟；一句话可能跨过多个标注（短停顿被合并）
+                speech_start = min(seg[0] for seg in covered)
+                speech_end = max(seg[1] for seg in covered)
+                result["endpoint_latency"] = u.endpoint_time - speech_end
+                result["truncated"] = result["truncated"] or audio_end < speech_end - 0.1 \
+                    or u.start_time > speech_start + 0.1 + endpointer.preroll_duration
+        results.append(result)
+
+    missed = 0
+    if segments is not None:
+        missed = sum(1 for seg in segments
+                     if not any(_overlap(r["start"], r["end"], seg[0], seg[1]) > 0 for r in results))
+    return results, {"audio_seconds": n_frames * frame_duration, "missed": missed,
+                     "bytes_uploaded": backend.metrics.bytes_sent, "requests": backend.metrics.requests,
+                     "frames": n_frames, "vad_frames": gate.frames_passed if gate else n_frames}
+
+
+def summarize(all_results, all_stats, wall_time):
+    latencies = np.array([r["endpoint_latency"] for r in all_results if not r["false_trigger"]], dtype=float)
+    audio_seconds = sum(s["audio_seconds"] for s in all_stats)
+    return {
+        "utterances": len(all_results),
+        "latency_mean": float(latencies.mean()) if latencies.size else float("nan"),
+        "latency_p95": float(np.percentile(latencies, 95)) if latencies.size else float("nan"),
+        "truncated": sum(r["truncated"] for r in all_results),
+        "false_triggers": sum(r["false_trigger"] for r in all_results),
+        "missed": sum(s["missed"] for s in all_stats),
+        "bytes_uploaded": sum(s["bytes_uploaded"] for s in all_stats),
+        "vad_rate": sum(s["vad_frames"] for s in all_stats) / max(1, sum(s["frames"] for s in all_stats)),
+        "speedup": audio_seconds / wall_time if wall_time > 0 else float("inf"),
+    }
+
+
+def run_replay(fixtures, vad_mode=2, use_gate=True, verbose=False, **endpointer_kwargs):
+    """对一组录音运行回放，返回汇总统计"""
+    all_results, all_stats = [], []
+    start = time.perf_counter()
+    for path in fixtures:
+        segments = load_labels(labels_path(path))
+        results, stats = replay(load_fixture(path), segments, vad_mode=vad_mode, use_gate=use_gate,
+                                 **endpointer_kwargs)
+        all_results.extend(results)
+        all_stats.append(stats)
+        if verbose:
+            print_utterances(path, results)
+    return summarize(all_results, all_stats, time.perf_counter() - start)
+
+
+def print_utterances(path, results):
+    print(f"== {path}")
+    for i, r in enumerate(results):
+        flags = ("截断 " if r["truncated"] else "") + ("误触发" if r["false_trigger"] else "")
+        print(f"  #{i:<3}{r['start']:>8.2f}{r['end']:>8.2f}  延迟{r['endpoint_latency']:>6.2f}s"
+              f"{r['bytes']:>9}B  {r['reason']:<13}{flags}  {r['text'] or ''}")
+
+
+def _floats(text):
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线回放录音，评估VAD和端点检测参数")
+    parser.add_argument("fixtures", nargs="+", help="WAV或PCM录音，同名.txt为Audacity标签（可选）")
+    parser.add_argument("--vad", default="2", help="webrtcvad 灵敏度，逗号分隔可做参数扫描")
+    parser.add_argument("--silence", default="0.5", help="初始静音阈值（秒），逗号分隔")
+    parser.add_argument("--min-silence", default="0.3", help="自适应静音阈值下限，逗号分隔")
+    parser.add_argument("--max-silence", default="1.0", help="自适应静音阈值上限，逗号分隔")
+    parser.add_argument("--max-duration", type=float, default=15.0)
+    parser.add_argument("--no-gate", action="store_true", help="不使用能量预筛选，每帧都调用VAD")
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印每句话的结果")
+    args = parser.parse_args()
+
+    header = f"{'VAD':>4}{'静音':>6}{'下限':>6}{'上限':>6}{'句数':>6}{'平均延迟':>9}{'P95延迟':>9}{'截断':>6}{'误触发':>7}{'漏检':>6}{'上传KB':>9}{'VAD帧%':>8}{'倍速':>8}"
+    rows = []
+    for vad_mode, silence, min_silence, max_silence in itertools.product(
+            [int(v) for v in args.vad.split(",")], _floats(args.silence),
+            _floats(args.min_silence), _floats(args.max_silence)):
+        s = run_replay(args.fixtures, vad_mode=vad_mode, use_gate=not args.no_gate, verbose=args.verbose,
+                       silence_duration=silence, min_silence=min_silence,
+                       max_silence=max_silence, max_duration=args.max_duration)
+        rows.append(f"{vad_mode:>4}{silence:>6.2f}{min_silence:>6.2f}{max_silence:>6.2f}{s['utterances']:>6}"
+                    f"{s['latency_mean']:>9.2f}{s['latency_p95']:>9.2f}{s['truncated']:>6}{s['false_triggers']:>7}"
+                    f"{s['missed']:>6}{s['bytes_uploaded'] / 1024:>9.1f}{s['vad_rate'] * 100:>8.1f}{s['speedup']:>8.0f}")
+    print(header)
+    print("-" * len(header))
+    print("\n".join(rows))
@@ -0,0 +1,162 @@
+import time
+import asyncio
+import logging
+import threading
+from ASR.backends import get_asr_backend, get_fallback_backends
+
+# 这些错误是请求本身的问题（没听清、音频格式不对等），重试或换后端都没有用
+CLIENT_ERRORS = {3300, 3301, 3308, 3309, 3310, 3311, 3312}
+TIMEOUT_ERROR = -3
+UNAVAILABLE_ERROR = -2
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后一段时间内不再请求该后端，之后放行一次试探请求"""
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False  # 半开状态下是否已有试探请求
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial:
+            self.trial = True
+            return True
+        return False
+
+    def release(self):
+        """试探请求没有完成（被取消），不说明后端好坏，把试探名额还回去"""
+        self.trial = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ResilientASR:
+    """异步识别请求层：每次请求有截止时间，失败有限次重试，慢请求发对冲请求，后端熔断后切换到备用后端
+
+    识别本身在线程中执行（后端接口是同步的），超时或对冲落败的请求结果被丢弃
+    """
+
+    def __init__(self, primary, fallbacks=(), deadline=3.0, retries=1, backoff=0.2,
+                 hedge=True, hedge_percentile=95, hedge_min_samples=20,
+                 breaker_threshold=3, breaker_reset=30.0):
+        self.backends = [primary, *fallbacks]
+        self.deadline = deadline  # 单次请求的截止时间（秒）
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile  # 超过历史耗时的该分位数仍未返回就发对冲请求
+        self.hedge_min_samples = hedge_min_samples
+        self.breakers = {id(b): CircuitBreaker(breaker_threshold, breaker_reset) for b in self.backends}
+        self.stats = {"timeouts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+
+    @staticmethod
+    def _failed(result):
+        """是否是后端故障（超时、网络、服务端错误），而不是正常的识别结果"""
+        return result['err_no'] != 0 and result['err_no'] not in CLIENT_ERRORS
+
+    def hedge_delay(self, backend):
+        if not self.hedge or len(backend.metrics.latencies) < self.hedge_min_samples:
+            return None
+        delay = backend.metrics.percentile(self.hedge_percentile)
+        return delay if delay < self.deadline else None
+
+    async def transcribe(self, audio, rate=16000):
+        """识别一段音频，返回百度格式的结果；所有后端都不可用时 err_no 为 -2"""
+        result = {'err_no': UNAVAILABLE_ERROR, 'err_msg': '所有识别后端都不可用', 'result': []}
+        for i, backend in enumerate(self.backends):
+            breaker = self.breakers[id(backend)]
+            if not breaker.allow():
+                continue
+            if i > 0:
+                self.stats["failovers"] += 1
+                logging.warning(f"识别切换到备用后端 {backend.name}")
+            completed = False
+            try:
+                result = await self._with_retries(backend, audio, rate)
+                completed = True
+            finally:
+                if not completed:
+                    # 被取消（如用户打断）或意外异常：不记成败，但不能让半开的试探名额一直被占着
+                    breaker.release()
+            if self._failed(result):
+                breaker.record_failure()
+                if breaker.state != "closed":
+                    logging.warning(f"识别后端 {backend.name} 已熔断 {breaker.reset_timeout:.0f} 秒")
+                continue
+            breaker.record_success()
+            return result
+        return result
+
+    async def _with_retries(self, backend, audio, rate):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                result = await asyncio.wait_for(self._hedged(backend, audio, rate), self.deadline)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                logging.warning(f"{backend.name} 识别超过 {self.deadline:.1f} 秒未返回")
+                result = {'err_no': TIMEOUT_ERROR, 'err_msg': 'request timeout', 'result': []}
+            if not self._failed(result):
+                return result
+        return result
+
+    async def _hedged(self, backend, audio, rate):
+        first = asyncio.create_task(asyncio.to_thread(backend.transcribe, audio, rate))
+        tasks = {first}
+        try:
+            delay = self.hedge_delay(backend)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    # 第一个请求落在长尾里，再发一个，谁先回来用谁
+                    self.stats["hedges"] += 1
+                    tasks.add(asyncio.create_task(asyncio.to_thread(backend.transcribe, audio, rate)))
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if not self._failed(result) or not tasks:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        return result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+_requester = None
+_requester_lock = threading.Lock()
+
+
+def get_asr_requester():
+    """进程内共享的识别请求层，熔断状态在各模块间共享"""
+    global _requester
+    with _requester_lock:
+        if _requester is None:
+            _requester = ResilientASR(get_asr_backend(), get_fallback_backends())
+        return _requester
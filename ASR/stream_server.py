@@ -0,0 +1,82 @@
+import sys
+import os
+sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
+import json
+import asyncio
+import logging
+import argparse
+import websockets
+from ASR.backends import StandInBackend, create_backend
+
+
+class StandInStreamServer:
+    """本地替身流式识别服务，协议与百度实时语音识别相同，用于测试
+
+    每收到 partial_seconds 秒音频返回一次 MID_TEXT，收到 FINISH 后返回 FIN_TEXT 并断开。
+    默认用替身后端，中间结果为固定文本按音频长度截取的前缀；也可以挂本地识别后端（如vosk）
+    """
+
+    def __init__(self, backend=None, partial_seconds=0.5, rate=16000, words_per_second=4.0):
+        self.backend = backend or StandInBackend()
+        self.partial_bytes = int(partial_seconds * rate * 2)
+        self.rate = rate
+        self.words_per_second = words_per_second
+        self.sessions = 0
+
+    def _partial_text(self, frames, num_bytes):
+        if isinstance(self.backend, StandInBackend):
+            # 按说话时长截取固定文本，模拟逐渐变长的中间结果
+            n = int(num_bytes / 2 / self.rate * self.words_per_second)
+            return self.backend.text[:max(1, n)]
+        result = self.backend.transcribe(frames, self.rate)
+        return result['result'][0] if result['err_no'] == 0 else ""
+
+    async def handler(self, ws, *args):
+        self.sessions += 1
+        frames, num_bytes, next_partial = [], 0, self.partial_bytes
+        started = False
+        async for message in ws:
+            if isinstance(message, bytes):
+                if not started:
+                    await ws.send(json.dumps({"type": "FIN_TEXT", "err_no": -3005, "err_msg": "START not received"}))
+                    break
+                frames.append(message)
+                num_bytes += len(message)
+                if num_bytes >= next_partial:
+                    next_partial += self.partial_bytes
+                    text = await asyncio.to_thread(self._partial_text, list(frames), num_bytes)
+                    await ws.send(json.dumps({"type": "MID_TEXT", "err_no": 0, "err_msg": "OK", "result": text}))
+                continue
+            msg = json.loads(message)
+            if msg.get("type") == "START":
+                started = True
+            elif msg.get("type") == "FINISH":
+                result = await asyncio.to_thread(self.backend.transcribe, frames, self.rate)
+                text = result['result'][0] if result['err_no'] == 0 else ""
+                await ws.send(json.dumps({"type": "FIN_TEXT", "err_no": result['err_no'],
+                                          "err_msg": result['err_msg'], "result": text}))
+                break
+            elif msg.get("type") == "CANCEL":
+                break
+        await ws.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """启动服务，返回 websockets 的服务对象"""
+        return await websockets.serve(self.handler, host, port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地替身流式识别服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--backend", default="standin", help="识别后端：standin / vosk")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        server = StandInStreamServer(create_backend(args.backend))
+        await server.serve(args.host, args.port)
+        print(f"替身流式识别服务: ws://{args.host}:{args.port}  (设置 ASR_STREAM_URL 指向这里)")
+        await asyncio.Future()
+
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+
+try:
+    import websockets
+except ImportError:  # 流式识别是可选功能：pip install websockets
+    websockets = None
+
+BAIDU_REALTIME_URL = "wss://vop.baidu.com/realtime_asr"
+
+
+def common_prefix(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return a[:n]
+
+
+class StreamingSession:
+    """一次流式识别：边说边发送音频，边收中间结果，结束后返回最终结果
+
+    使用百度实时语音识别协议：START(文本) -> 音频(二进制) -> FINISH(文本)，
+    服务端返回 MID_TEXT（中间结果）和 FIN_TEXT（最终结果）
+    """
+
+    def __init__(self, ws, start_params, chunk_bytes=5120, on_partial=None):
+        self.ws = ws
+        self.start_params = start_params
+        self.chunk_bytes = chunk_bytes  # 每个音频包的大小，百度建议160ms
+        self.on_partial = on_partial
+        self.partial = ""
+        self.stable = ""  # 连续两次中间结果的公共前缀，可以提前用于检索
+        self.started = False
+        self._pending = bytearray()
+        self._final = asyncio.get_running_loop().create_future()
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def start(self):
+        await self.ws.send(json.dumps({"type": "START", "data": self.start_params}))
+        self.started = True
+
+    async def send(self, frame):
+        """发送一帧音频，凑够一个包再发"""
+        if not self.started:
+            await self.start()
+        self._pending += frame
+        if len(self._pending) >= self.chunk_bytes:
+            await self.ws.send(bytes(self._pending))
+            self._pending.clear()
+
+    async def finish(self, timeout=3.0):
+        """发送剩余音频和 FINISH，等待最终结果，返回百度短语音识别格式的结果"""
+        try:
+            if not self.started:
+                await self.start()
+            if self._pending:
+                await self.ws.send(bytes(self._pending))
+                self._pending.clear()
+            await self.ws.send(json.dumps({"type": "FINISH"}))
+            return await asyncio.wait_for(asyncio.shield(self._final), timeout)
+        finally:
+            await self.close()
+
+    async def cancel(self):
+        try:
+            await self.ws.send(json.dumps({"type": "CANCEL"}))
+        except Exception:
+            pass
+        await self.close()
+
+    async def close(self):
+        self._reader.cancel()
+        await self.ws.close()
+
+    async def _read_loop(self):
+        texts = []  # 服务端可能把一句话分成多段，每段一个 FIN_TEXT
+        try:
+            async for message in self.ws:
+                if isinstance(message, bytes):
+                    continue
+                msg = json.loads(message)
+                kind = msg.get("type")
+                if msg.get("err_no", 0) != 0:
+                    if not texts:
+                        self._resolve({'err_no': msg["err_no"], 'err_msg': msg.get("err_msg", ""), 'result': []})
+                        return
+                    # 已经有确定的分段，错误只记日志，把已识别的文字交出去
+                    logging.warning(f"流式识别出错: {msg['err_no']} {msg.get('err_msg', '')}，保留已识别的 {len(texts)} 段")
+                    break
+                if kind == "MID_TEXT":
+                    self._on_mid_text("".join(texts) + msg.get("result", ""))
+                elif kind == "FIN_TEXT":
+                    texts.append(msg.get("result", ""))
+                    self._on_mid_text("".join(texts))
+        except Exception as e:
+            if not self._final.done():
+                logging.error(f"流式识别连接出错: {e}")
+        text = "".join(texts)
+        if text:
+            self._resolve({'err_no': 0, 'err_msg': 'success.', 'result': [text]})
+        else:
+            self._resolve({'err_no': 3301, 'err_msg': 'speech quality error.', 'result': []})
+
+    def _on_mid_text(self, text):
+        self.stable = common_prefix(self.partial, text) if self.partial else ""
+        self.partial = text
+        if self.on_partial is not None:
+            self.on_partial(text, self.stable)
+
+    def _resolve(self, result):
+        if not self._final.done():
+            self._final.set_result(result)
+
+
+class StreamingRecognizer:
+    """百度实时语音识别客户端，凭据从环境变量读取；url 可以指向本地替身服务"""
+
+    def __init__(self, url=None, app_id=None, app_key=None, dev_pid=15372, cuid="sweet-potato-kiosk",
+                 rate=16000, chunk_bytes=5120, connect_timeout=2.0):
+        if websockets is None:
+            raise ImportError("流式识别需要安装 websockets")
+        self.url = url or os.environ.get("ASR_STREAM_URL", BAIDU_REALTIME_URL)
+        self.start_params = {
+            "appid": int(app_id or os.environ.get("BAIDU_APP_ID", "0") or 0),
+            "appkey": app_key or os.environ.get("BAIDU_API_KEY", ""),
+            "dev_pid": dev_pid,  # 15372: 普通话，加强标点
+            "cuid": cuid,
+            "format": "pcm",
+            "sample": rate,
+        }
+        self.chunk_bytes = chunk_bytes
+        self.connect_timeout = connect_timeout
+
+    async def open(self, on_partial=None):
+        """建立连接（在用户开口之前调用，握手时间与等待说话重叠）"""
+        url = f"{self.url}?sn={uuid.uuid4()}"
+        ws = await asyncio.wait_for(websockets.connect(url), self.connect_timeout)
+        return StreamingSession(ws, self.start_params, self.chunk_bytes, on_partial)
@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import collections
+import edge_tts
+
+
+def normalize_text(text):
+    """缓存键用的文本：统一空白，去掉首尾的标点，同一句话不同写法共用一份音频"""
+    text = re.sub(r"\s+", " ", text or "").strip()
+    return text.strip(",，。.!！?？;；:： ")
+
+
+async def edge_stream(text, voice, rate, volume):
+    """用 edge-tts 合成一段文本，边收边产出mp3数据块"""
+    communicate = edge_tts.Communicate(text, voice, rate=rate, volume=volume)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            yield chunk["data"]
+
+
+class TTSCache:
+    """两级TTS音频缓存：内存LRU + 限制总大小的磁盘缓存
+
+    以 (规范化文本, 音色, 语速, 音量) 的哈希为键，固定提示语、重复的答案只合成一次。
+    磁盘文件按最近使用时间淘汰，重启后仍然有效。
+    """
+
+    def __init__(self, cache_dir="cache/tts", memory_bytes=16 * 1024 * 1024, disk_bytes=200 * 1024 * 1024,
+                 synthesize=edge_stream):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.synthesize = synthesize  # 异步生成器：(文本, 音色, 语速, 音量) -> mp3数据块
+        self._memory = collections.OrderedDict()  # key -> mp3字节，最近使用的在末尾
+        self._memory_size = 0
+        self._disk = collections.OrderedDict()  # key -> 文件大小
+        self._disk_size = 0
+        self._resident = {}  # 预合成的固定提示语，常驻内存，不参与淘汰
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "synth_seconds": 0.0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan_disk()
+
+    @staticmethod
+    def key(text, voice, rate, volume):
+        raw = json.dumps([normalize_text(text), voice, rate, volume], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _scan_disk(self):
+        """启动时按修改时间重建磁盘索引"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".mp3"):
+                st = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def _remember(self, key, data):
+        """放入内存LRU，超出容量时淘汰最久未用的"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def _evict_disk(self):
+        for key in list(self._disk):
+            if self._disk_size <= self.disk_bytes:
+                break
+            if key in self._resident:
+                continue
+            self._disk_size -= self._disk.pop(key)
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def _lookup(self, key):
+        """查内存和磁盘，返回mp3字节或None（在线程中调用）"""
+        with self._lock:
+            data = self._resident.get(key)
+            if data is None and key in self._memory:
+                data = self._memory[key]
+                self._memory.move_to_end(key)
+            if data is not None:
+                self.stats["memory_hits"] += 1
+                return data
+            on_disk = key in self._disk
+        if not on_disk:
+            return None
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+            os.utime(self.path(key))
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(key, 0)
+            return None
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, data)
+            self.stats["disk_hits"] += 1
+        return data
+
+    def _store(self, key, data):
+        """写入内存和磁盘（先写临时文件再改名，播放器不会读到半个文件）"""
+        tmp = self.path(key) + f".{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path(key))
+        with self._lock:
+            self._remember(key, data)
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_size += len(data)
+            self._disk.move_to_end(key)
+            self._evict_disk()
+
+    def contains(self, text, voice, rate, volume):
+        key = self.key(text, voice, rate, volume)
+        with self._lock:
+            return key in self._resident or key in self._memory or key in self._disk
+
+    async def stream(self, text, voice, rate, volume):
+        """逐块产出一段文本的mp3数据：命中缓存时一次给出；否则边合成边产出，合成完整后写入缓存"""
+        key = self.key(text, voice, rate, volume)
+        data = await asyncio.to_thread(self._lookup, key)
+        if data is not None:
+            yield data
+            return
+        self.stats["misses"] += 1
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        audio = bytearray()
+        async for chunk in self.synthesize(text, voice, rate, volume):
+            audio += chunk
+            yield chunk
+        self.stats["synth_seconds"] += loop.time() - start
+        if audio:  # 中途取消的不完整音频不会走到这里
+            await asyncio.to_thread(self._store, key, bytes(audio))
+
+    async def fetch(self, text, voice, rate, volume):
+        """取一段文本的mp3字节，没有缓存时合成并写入缓存；合成结果为空时返回None"""
+        audio = bytearray()
+        async for chunk in self.stream(text, voice, rate, volume):
+            audio += chunk
+        return bytes(audio) or None
+
+    async def fetch_path(self, text, voice, rate, volume):
+        """取一段文本在磁盘上的mp3文件路径，给按文件播放的播放器用（文件归缓存所有，不要删除）"""
+        data = await self.fetch(text, voice, rate, volume)
+        if data is None:
+            return None
+        key = self.key(text, voice, rate, volume)
+        if not os.path.exists(self.path(key)):
+            # 刚好被淘汰，重新写回磁盘
+            await asyncio.to_thread(self._store, key, data)
+        return self.path(key)
+
+    async def warm_up(self, texts, voice, rate, volume, concurrency=4):
+        """并行预合成一组固定文本并常驻内存，返回成功的条数"""
+        pending = {}
+        for text in texts:
+            if normalize_text(text):
+                pending.setdefault(self.key(text, voice, rate, volume), text)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm(key, text):
+            async with semaphore:
+                try:
+                    data = await self.fetch(text, voice, rate, volume)
+                except Exception as e:
+                    logging.warning(f"预合成失败: {text} ({e})")
+                    return False
+            if data is None:
+                return False
+            with self._lock:
+                self._resident[key] = data
+            return True
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(warm(key, text) for key, text in pending.items()))
+        logging.info(f"预合成 {sum(results)}/{len(pending)} 条固定语音，用时 {time.perf_counter() - start:.2f}s")
+        return sum(results)
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def summary(self):
+        with self._lock:
+            return {**self.stats, "hit_rate": round(self.hit_rate(), 3), "resident_items": len(self._resident),
+                    "memory_items": len(self._memory), "memory_bytes": self._memory_size,
+                    "disk_items": len(self._disk), "disk_bytes": self._disk_size}
+
+
+async def stop_warm_up(task):
+    """结束后台预合成任务：还没完成就取消，结果记入日志，退出时不会留下未取回的异常"""
+    if task is None:
+        return
+    if not task.done():
+        task.cancel()
+    result, = await asyncio.gather(task, return_exceptions=True)
+    if isinstance(result, asyncio.CancelledError):
+        logging.info("预合成未完成，已取消")
+    elif isinstance(result, BaseException):
+        logging.warning(f"预合成失败: {result}")
+
+
+_tts_cache = None
+
+
+def get_tts_cache():
+    """所有TTS模块共用的音频缓存（环境变量 TTS_CACHE_DIR / TTS_CACHE_MB 可调整位置和磁盘容量）"""
+    global _tts_cache
+    if _tts_cache is None:
+        disk_mb = float(os.environ.get("TTS_CACHE_MB", "200"))
+        _tts_cache = TTSCache(os.environ.get("TTS_CACHE_DIR", "cache/tts"),
+                              disk_bytes=int(disk_mb * 1024 * 1024))
+        logging.info(f"TTS缓存: {_tts_cache.cache_dir}，已有 {len(_tts_cache._disk)} 条")
+    return _tts_cache
@@ -0,0 +1,44 @@
+"""MP3帧头解析：不解码就能算出一段MP3的播放时长（edge-tts 输出的是 MPEG Layer III）"""
+
+# 比特率表（kbps），下标为帧头中的比特率索引
+BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],  # MPEG2 / MPEG2.5
+}
+# 采样率表，键为帧头中的版本位：3 = MPEG1，2 = MPEG2，0 = MPEG2.5
+SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _skip_id3(data):
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size
+    return 0
+
+
+def mp3_duration(data):
+    """逐帧累加MP3的时长（秒），遇到非帧数据时向后查找下一个同步字"""
+    pos = _skip_id3(data)
+    end = len(data)
+    seconds = 0.0
+    while pos + 4 <= end:
+        b1, b2 = data[pos + 1], data[pos + 2]
+        if data[pos] != 0xFF or b1 & 0xE0 != 0xE0:
+            pos += 1
+            continue
+        version = (b1 >> 3) & 3
+        layer = (b1 >> 1) & 3  # 1 = Layer III
+        bitrate_index = b2 >> 4
+        rate_index = (b2 >> 2) & 3
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            pos += 1
+            continue
+        rate = SAMPLE_RATES[version][rate_index]
+        bitrate = BITRATES["mpeg1" if version == 3 else "mpeg2"][bitrate_index] * 1000
+        samples = 1152 if version == 3 else 576  # 每帧采样数
+        frame_bytes = samples // 8 * bitrate // rate + ((b2 >> 1) & 1)
+        if pos + frame_bytes > end:
+            break  # 不完整的最后一帧，播放器也不会播放
+        seconds += samples / rate
+        pos += frame_bytes
+    return seconds
@@ -2,12 +2,11 @@ import sys
 import os
 sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
 import asyncio
-import edge_tts
 import re
 import os
-import subprocess
 import logging
-import time
+from TTS.cache import get_tts_cache
+from TTS.mp3 import mp3_duration
 
 class TTSHelper:
     def __init__(self, voice="zh-CN-XiaoyiNeural", rate="+0%", volume="+0%"):
@@ -17,6 +16,9 @@ class TTSHelper:
         self.max_retries = 3  # 最大重试次数
         self.retry_delay = 1  # 重试间隔秒数
         self.is_speaking = False  # 是否正在说话
+        self.cache = get_tts_cache()  # 合成过的语音直接从缓存播放
+        self.jitter_seconds = 0.2  # 边合成边播放时，先缓冲这么长的音频再开始写入播放器
+        self.written_bytes = 0  # 本次播放已写入播放器的字节数
 
     def preprocess_text(self, text):
         """
@@ -37,7 +39,7 @@ class TTSHelper:
 
     async def speak(self, text):
         """
-        异步输出语音，使用 edge-tts 生成音频文件并通过系统播放器播放
+        异步输出语音，edge-tts 合成的音频边收边送入系统播放器
         增加错误处理和重试机制
         """
         processed_text = self.preprocess_text(text)
@@ -53,41 +55,24 @@ class TTSHelper:
         
         # 重试循环
         for attempt in range(self.max_retries):
+            self.written_bytes = 0  # 在启动播放器之前清零，启动失败时不会沿用上一句的计数
             try:
-                # 创建 edge-tts Communicate 实例
-                communicate = edge_tts.Communicate(
-                    text=processed_text,
-                    voice=self.voice,
-                    rate=self.rate,
-                    volume=self.volume
-                )
-                
-                # 保存音频到临时文件
-                output_file = f"temp_audio_{id(self)}_{int(time.time())}.mp3"  # 唯一文件名避免冲突
-                
-                # 尝试保存音频
-                await communicate.save(output_file)
-                
-                # 使用 mpg123 播放音频
-                result = subprocess.run(["mpg123", "-q", output_file], capture_output=True, text=True)
-                if result.returncode != 0:
-                    print(f"mpg123 播放失败：{result.stderr}")
-                    raise RuntimeError(f"mpg123 播放失败：{result.stderr}")
+                # 命中缓存时直接播放，否则边合成边播放，合成完整后写入缓存
+                await self._play_stream(processed_text)
                     
                 # print(f"语音播放完成：{processed_text}")
                 
-                # 删除临时音频文件
-                try:
-                    os.remove(output_file)
-                except Exception as e:
-                    print(f"删除临时文件失败：{e}")
-                
                 # 成功退出重试循环
                 break
                 
             except Exception as e:
                 # 记录错误
                 logging.error(f"TTS尝试 {attempt+1}/{self.max_retries} 失败: {e}")
+
+                # 已经有音频送进播放器时不再重试，否则用户会从头再听一遍
+                if self.written_bytes:
+                    print(f"语音播放中断，剩余内容直接显示文本: {processed_text}")
+                    break
                 
                 # 如果是最后一次尝试，使用备用方法或者打印错误
                 if attempt == self.max_retries - 1:
@@ -102,6 +87,45 @@ class TTSHelper:
         # 设置为结束说话状态
         self.is_speaking = False
 
+    async def _play_stream(self, text):
+        """把合成的音频块逐块写入 mpg123 的标准输入，播放器退出（即播放完）时返回"""
+        player = await asyncio.create_subprocess_exec(
+            "mpg123", "-q", "-",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        errors = asyncio.create_task(player.stderr.read())
+        pending = bytearray()
+        try:
+            async for chunk in self.cache.stream(text, self.voice, self.rate, self.volume):
+                pending += chunk
+                # 开头先攒一点音频，网络抖动时不会一开始就断续
+                if not self.written_bytes and mp3_duration(pending) < self.jitter_seconds:
+                    continue
+                player.stdin.write(pending)
+                self.written_bytes += len(pending)
+                pending.clear()
+                await player.stdin.drain()
+            if pending:
+                player.stdin.write(pending)
+                self.written_bytes += len(pending)
+                await player.stdin.drain()
+            player.stdin.close()
+            await player.wait()
+        except BaseException:
+            if player.returncode is None:
+                player.kill()
+                await player.wait()
+            raise
+        finally:
+            stderr = (await errors).decode(errors="ignore").strip()
+        if self.written_bytes == 0:
+            raise RuntimeError("语音合成结果为空")
+        if player.returncode != 0:
+            print(f"mpg123 播放失败：{stderr}")
+            raise RuntimeError(f"mpg123 播放失败：{stderr}")
+
     async def text_to_speech(self, text, wait=True):
         """
         文本转语音的入口，调用语音播放
@@ -114,6 +138,11 @@ class TTSHelper:
         
         return task
 
+    async def warm_up(self, texts):
+        """启动时预合成固定提示语（与播放时做同样的预处理，保证命中缓存）"""
+        texts = [self.preprocess_text(t) for t in texts]
+        return await self.cache.warm_up(texts, self.voice, self.rate, self.volume)
+
     async def wait_until_done(self):
         """
         等待直到所有语音播放完成
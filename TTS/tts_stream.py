@@ -1,14 +1,14 @@
 import asyncio
-import edge_tts
 import subprocess
-import io
 import logging
 import re
 import time
+from TTS.cache import get_tts_cache
+from TTS.mp3 import mp3_duration
 
 
 class TTSStreamer:
-    def __init__(self, voice="zh-CN-XiaoyiNeural", rate="+0%", volume="+0%"):
+    def __init__(self, voice="zh-CN-XiaoyiNeural", rate="+0%", volume="+0%", prefetch=3):
         self.voice = voice
         self.rate = rate
         self.volume = volume
@@ -17,9 +17,26 @@ class TTSStreamer:
         self.mpg123_process = None
         self.speech_queue = asyncio.Queue()
         self.speech_task = None
+        # 流水线：合成阶段最多提前 prefetch 段并行合成，按入队顺序交给播放阶段
+        self.prefetch = prefetch
+        self._ready = asyncio.Queue()  # (文本, 合成任务)，顺序与 speech_queue 相同
+        self._slots = asyncio.Semaphore(prefetch)  # 播放跟不上时合成阶段在这里等待（背压）
+        self._synth_stage = None
+        self._current = None  # 正在播放的段落的合成任务
+        self._generation = 0  # 每次 cancel 加一，合成阶段据此丢弃取消前拿到的文本
         self._playback_complete = asyncio.Event()
         self._playback_complete.set()  # Initially set
         self._last_audio_time = 0
+        # 播放时钟：按MP3帧头算出的时长推算每段真正播完的时刻
+        self._play_until = 0.0  # 已写入播放器的音频预计播完的时刻（loop.time()）
+        self._pending_segments = 0  # 已写入但还没播完的段数
+        self._scheduled = []  # [(播完通知的定时器, 文本)]，按播完时刻排列
+        self._interrupted = asyncio.Event()  # cancel 时设置，唤醒等待当前段播完的播放阶段
+        self.output_latency = 0.1  # 声卡缓冲带来的延迟
+        self.lead_time = 0.3  # 当前段剩余这么多时就写入下一段，段间不留空隙
+        self.jitter_seconds = 0.2  # 边合成边播放时，先缓冲这么长的音频再开始写入播放器
+        self.on_segment_done = None  # 回调(文本)，在该段真正播完时调用
+        self.cache = get_tts_cache()
 
     def preprocess_text(self, text):
         """预处理文本，替换标点符号"""
@@ -47,6 +64,7 @@ class TTSStreamer:
                         stderr=subprocess.DEVNULL,
                         bufsize=1024*8
                     )
+                    self._play_until = 0.0  # 新进程，播放时钟重新开始
                     logging.info("mpg123播放器已启动")
                 except Exception as e:
                     logging.error(f"启动mpg123失败: {e}")
@@ -70,90 +88,181 @@ class TTSStreamer:
                 except Exception as e:
                     logging.error(f"关闭mpg123时出错: {e}")
 
-    async def _generate_speech(self, text):
-        """生成语音数据"""
-        if not text or not text.strip():
-            return None
-            
+    async def _generate_speech(self, text, chunks):
+        """生成语音数据，边合成边把数据块放入 chunks，结束（或出错、被取消）时放入 None"""
         try:
-            communicate = edge_tts.Communicate(
-                text, 
-                self.voice,
-                rate=self.rate,
-                volume=self.volume
-            )
-            
-            audio_data = io.BytesIO()
-            
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    audio_data.write(chunk["data"])
-                    
-            if audio_data.tell() > 0:
-                audio_data.seek(0)
-                return audio_data.getvalue()
-            else:
-                return None
+            if text and text.strip():
+                # 缓存命中时不走网络，一次给出整段音频
+                async for chunk in self.cache.stream(text, self.voice, self.rate, self.volume):
+                    chunks.put_nowait(chunk)
         except Exception as e:
             logging.error(f"生成语音时出错: {e}")
-            return None
+        finally:
+            chunks.put_nowait(None)
             
+    async def _synthesis_stage(self):
+        """合成阶段：按顺序取文本并启动合成，与前面段落的播放重叠"""
+        while True:
+            text = await self.speech_queue.get()
+            if text is None:  # 结束信号，传给播放阶段
+                await self._ready.put(None)
+                return
+            generation = self._generation
+            await self._slots.acquire()
+            if generation != self._generation:  # 等待期间被取消
+                self._slots.release()
+                self.speech_queue.task_done()
+                continue
+            chunks = asyncio.Queue()
+            task = asyncio.create_task(self._generate_speech(text, chunks))
+            await self._ready.put((text, chunks, task))
+
     async def _speech_processor(self):
-        """处理语音队列的后台任务，使用优化的延迟策略"""
+        """播放阶段：按顺序把各段的数据块写入播放器，下一段在播放期间已经在合成"""
         try:
             await self.start_player()
+            self._synth_stage = asyncio.create_task(self._synthesis_stage())
             
             while True:
-                text = await self.speech_queue.get()
+                item = await self._ready.get()
                 
-                if text is None:  # 结束信号
+                if item is None:  # 结束信号
                     break
+                text, chunks, task = item
+                self._current = task
                     
                 try:
                     self._playback_complete.clear()
                     self.is_speaking = True
                     
-                    audio_data = await self._generate_speech(text)
-                    
-                    if audio_data:
-                        if self.mpg123_process and self.mpg123_process.poll() is None:
-                            self.mpg123_process.stdin.write(audio_data)
-                            self.mpg123_process.stdin.flush()
-                            
-                            # 优化延迟策略 - 更准确的估算
-                            text_length = len(text)
-                            base_delay = 0.15  
-                            min_delay = 0.8    
-                            max_delay = 8.0    
-                            
-                            delay = max(min_delay, min(max_delay, text_length * base_delay))
-                            await asyncio.sleep(delay + 0.3)  
-                            
-                        else:
-                            await self.start_player()
-                            if self.mpg123_process:
-                                self.mpg123_process.stdin.write(audio_data)
-                                self.mpg123_process.stdin.flush()
-                                
-                                text_length = len(text)
-                                delay = max(0.8, min(8.0, text_length * 0.12))
-                                await asyncio.sleep(delay + 0.3)
+                    if not await self._play_stream(text, chunks):
+                        self._finish_segment(text)
                     
                     self._last_audio_time = time.time()
                     
+                    # 当前段快播完时再处理下一段：下一段紧接着播放，打断时也不会积压太多音频
+                    loop = asyncio.get_running_loop()
+                    delay = self._play_until - self.lead_time - loop.time()
+                    if delay > 0:
+                        self._interrupted.clear()
+                        try:
+                            await asyncio.wait_for(self._interrupted.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    
                 except Exception as e:
                     logging.error(f"播放语音时出错: {e}")
+                    self._finish_segment(text)
                 
                 finally:
-                    self.is_speaking = False
-                    self._playback_complete.set()
-                    self.speech_queue.task_done()
+                    self._current = None
+                    self._slots.release()
                 
         except Exception as e:
             logging.error(f"语音处理任务出错: {e}")
         finally:
+            if self._synth_stage and not self._synth_stage.done():
+                self._synth_stage.cancel()
+            self._synth_stage = None
             await self.stop_player()
             
+    async def _play_stream(self, text, chunks):
+        """边收边播一段语音，按音频时长推进播放时钟，并安排该段播完时的完成通知
+
+        先攒够 jitter_seconds 的音频再开始写入，网络抖动时播放器不会断续；返回是否播放了音频
+        """
+        loop = asyncio.get_running_loop()
+        generation = self._generation
+        self._pending_segments += 1
+        audio = bytearray()
+        written = 0
+        accounted = 0.0  # 已计入播放时钟的时长
+        try:
+            while True:
+                chunk = await chunks.get()
+                if generation != self._generation:  # 播放途中被打断，剩下的数据不再写入
+                    self._pending_segments -= 1
+                    return False
+                finished = chunk is None
+                if not finished:
+                    audio += chunk
+                    if not written and mp3_duration(audio) < self.jitter_seconds:
+                        continue
+                if len(audio) > written:
+                    if self.mpg123_process is None or self.mpg123_process.poll() is not None:
+                        await self.start_player()
+                    self.mpg123_process.stdin.write(audio[written:])
+                    self.mpg123_process.stdin.flush()
+                    written = len(audio)
+                    # 只计完整的帧；数据来得比播放慢时，时钟从当前时刻重新起算
+                    duration = mp3_duration(audio)
+                    self._play_until = max(loop.time(), self._play_until) + duration - accounted
+                    accounted = duration
+                if finished:
+                    break
+        except BaseException:
+            self._pending_segments -= 1
+            raise
+        if not written:
+            self._pending_segments -= 1
+            return False
+        handle = loop.call_at(self._play_until + self.output_latency, self._segment_played)
+        self._scheduled.append((handle, text))
+        return True
+
+    def _segment_played(self):
+        _, text = self._scheduled.pop(0)
+        self._pending_segments -= 1
+        self._finish_segment(text)
+
+    def _finish_segment(self, text):
+        """一段结束（播完、合成失败或出错）：通知等待方，全部播完时清除说话状态"""
+        if self.on_segment_done is not None:
+            self.on_segment_done(text)
+        if self._pending_segments == 0:
+            self.is_speaking = False
+            self._playback_complete.set()
+        self.speech_queue.task_done()
+
+    def cancel(self):
+        """打断播放：停止正在播放的声音，丢弃还没播放的段落，正在合成的请求一并取消；返回丢弃的段数"""
+        self._generation += 1
+        self._interrupted.set()
+        # 已写入播放器的音频随播放器一起丢弃，这些段立即算作播完
+        while self._scheduled:
+            self._scheduled[0][0].cancel()
+            self._segment_played()
+        if self.mpg123_process is not None:
+            if self.mpg123_process.poll() is None:
+                self.mpg123_process.kill()
+            try:
+                self.mpg123_process.stdin.close()
+            except OSError:
+                pass
+            self.mpg123_process = None  # 下一段播放时重新启动
+        self._play_until = 0.0
+        if self._current is not None:
+            self._current.cancel()
+        cancelled = 0
+        while not self.speech_queue.empty():
+            if self.speech_queue.get_nowait() is None:
+                self.speech_queue.put_nowait(None)  # 保留结束信号
+                break
+            self.speech_queue.task_done()
+            cancelled += 1
+        while not self._ready.empty():
+            item = self._ready.get_nowait()
+            if item is None:
+                self._ready.put_nowait(None)
+                break
+            item[2].cancel()
+            self._slots.release()
+            self.speech_queue.task_done()
+            cancelled += 1
+        if cancelled:
+            logging.info(f"已取消 {cancelled} 段未播放的语音")
+        return cancelled
+
     async def start_speech_processor(self):
         """启动语音处理任务"""
         if self.speech_task is None or self.speech_task.done():
@@ -166,8 +275,8 @@ class TTSStreamer:
             await self.speech_task
             self.speech_task = None
 
-    async def speak_text(self, text, wait=False):
-        """流式处理文本"""
+    def split_segments(self, text):
+        """预处理并按逗号分段，每段单独合成和播放"""
         text = self.preprocess_text(text)
         
         # 简单分段，不要太复杂
@@ -191,6 +300,16 @@ class TTSStreamer:
         # 如果没有分段，就作为整体
         if not segments:
             segments = [text]
+        return segments
+
+    async def warm_up(self, texts):
+        """启动时预合成固定提示语，按播放时的分段缓存，对话中直接命中"""
+        segments = [segment for text in texts for segment in self.split_segments(text)]
+        return await self.cache.warm_up(segments, self.voice, self.rate, self.volume)
+
+    async def speak_text(self, text, wait=False):
+        """流式处理文本"""
+        segments = self.split_segments(text)
             
         # 确保处理器运行
         await self.start_speech_processor()
@@ -204,20 +323,10 @@ class TTSStreamer:
         if wait:
             await self.wait_until_done()
     
-    # Optimized wait_until_done Method
-
-
     async def wait_until_done(self):
-        """等待所有语音播放完成 - 使用更智能的策略"""
-        # 等待队列清空
-        if self.speech_queue.qsize() > 0:
-            await self.speech_queue.join()
-        
-        # 等待最后一个音频播放完成
+        """等待所有语音真正播放完成（按音频时长推算，不再按文本长度估计）"""
+        await self.speech_queue.join()
         await self._playback_complete.wait()
-        
-        # 减少额外等待时间，提高响应速度
-        await asyncio.sleep(0.4)  # 从1.0减少到0.4秒
 
     async def shutdown(self):
         """清理资源"""
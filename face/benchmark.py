@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
+import argparse
+import numpy as np
+from face.face_recognize import FaceRecognizer
+from face.face_gallery import FaceGallery, FaissFaceGallery, FAISS_INDEX_KINDS
+
+
+def pad_gallery(gallery, size, seed=0, index_kind=None):
+    """用随机特征把人脸库扩充到指定大小，模拟大规模人脸库（随机特征不会与真实人脸匹配）"""
+    extra = max(0, size - len(gallery))
+    if extra == 0 and index_kind is None:
+        return gallery
+    rng = np.random.default_rng(seed)
+    fake = rng.normal(0.0, 0.1, size=(extra, gallery.dim)).astype(np.float32)
+    names = list(gallery.names) + [f"__synthetic_{i}" for i in range(extra)]
+    encodings = np.vstack([gallery.encodings, fake])
+    if index_kind:
+        return FaissFaceGallery.build(names, encodings, index_kind, dim=gallery.dim)
+    return FaceGallery(names, encodings, dim=gallery.dim)
+
+
+def run_benchmark(db_path, clips, gallery_sizes, timeout=60.0, index_kind=None, **recognizer_kwargs):
+    """在录制好的视频/图片目录上无界面运行人脸认证，返回每组 (片段, 人脸库大小) 的统计"""
+    results = []
+    for clip in clips:
+        for size in gallery_sizes:
+            recognizer = FaceRecognizer(face_model_path=db_path, source=clip, headless=True,
+                                        timeout=timeout, index_backend="numpy", **recognizer_kwargs)
+            if not recognizer.initialize():
+                return results
+            recognizer.gallery = pad_gallery(recognizer.gallery, size, index_kind=index_kind)
+            recognizer.recognized_user = None
+
+            success, user = recognizer.recognize_face()
+            results.append({"clip": clip, "gallery_size": len(recognizer.gallery),
+                            "success": success, "user": user, **recognizer.stats})
+    return results
+
+
+def print_results(results):
+    header = f"{'片段':<30}{'库大小':>8}{'帧数':>6}{'FPS':>8}{'检测ms':>9}{'编码ms':>9}{'匹配ms':>9}{'首次匹配s':>11}  结果"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        frames = max(r["frames"], 1)
+        first = f"{r['time_to_first_match']:.2f}" if r["time_to_first_match"] is not None else "-"
+        print(f"{os.path.basename(r['clip']):<30}{r['gallery_size']:>8}{r['frames']:>6}{r['fps']:>8.1f}"
+              f"{r['detect_time'] * 1000 / frames:>9.2f}{r['encode_time'] * 1000 / frames:>9.2f}"
+              f"{r['match_time'] * 1000 / frames:>9.3f}{first:>11}  {r['user'] if r['success'] else '未识别'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="人脸认证离线基准测试")
+    parser.add_argument("clips", nargs="+", help="录制的视频文件或图片目录")
+    parser.add_argument("--db", default="face/face_model.npy", help="人脸数据库路径")
+    parser.add_argument("--gallery-sizes", default="0,1000,10000", help="扩充后的人脸库大小，逗号分隔，0表示不扩充")
+    parser.add_argument("--timeout", type=float, default=60.0, help="每个片段的最长认证时间")
+    parser.add_argument("--detect-scale", type=float, default=0.5)
+    parser.add_argument("--detect-every", type=int, default=2)
+    parser.add_argument("--model", default="hog", choices=["hog", "cnn"])
+    parser.add_argument("--num-jitters", type=int, default=1)
+    parser.add_argument("--index", choices=FAISS_INDEX_KINDS, default=None, help="使用FAISS索引匹配，默认numpy暴力匹配")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.gallery_sizes.split(",") if s.strip()]
+    results = run_benchmark(args.db, args.clips, sizes, timeout=args.timeout, index_kind=args.index,
+                            detect_scale=args.detect_scale, detect_every=args.detect_every,
+                            detector_model=args.model, num_jitters=args.num_jitters)
+    print_results(results)
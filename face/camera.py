@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+import cv2
+
+
+class CameraStream:
+    """后台采集线程，只保留最新一帧
+
+    采集线程不断调用 cap.read()，新帧直接覆盖旧帧；识别循环每次取到的都是最新画面，
+    不会在驱动队列里堆积过期帧，解码时间也不再计入识别循环
+    """
+
+    def __init__(self, source=0, buffer_size=1):
+        self.source = source
+        self.buffer_size = buffer_size
+        self.cap = None
+        self.thread = None
+        self.running = False
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._frame_id = 0  # 已采集的帧序号
+        self._read_id = 0  # 上次被取走的帧序号
+        self._start_time = 0.0
+
+        self.captured_frames = 0
+        self.consumed_frames = 0
+        self.dropped_frames = 0  # 未被取走就被覆盖的帧
+
+    def start(self):
+        """打开摄像头并启动采集线程"""
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            print(f"无法打开摄像头: {self.source}")
+            return False
+        # 尽量让驱动只缓存一帧
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        self.running = True
+        self._start_time = time.time()
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def _capture_loop(self):
+        while self.running:
+            ret, frame = self.cap.read()
+            with self._cond:
+                if not ret:
+                    self.running = False
+                    self._cond.notify_all()
+                    break
+                if self._frame_id > self._read_id:
+                    self.dropped_frames += 1
+                self._frame = frame
+                self._frame_id += 1
+                self.captured_frames += 1
+                self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """取出比上次更新的最新一帧，返回 (ret, frame)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._frame_id > self._read_id or not self.running, timeout):
+                return False, None
+            if self._frame_id == self._read_id:
+                return False, None
+            self._read_id = self._frame_id
+            self.consumed_frames += 1
+            return True, self._frame
+
+    @property
+    def capture_fps(self):
+        """采集线程的实际帧率"""
+        elapsed = time.time() - self._start_time
+        return self.captured_frames / elapsed if elapsed > 0 else 0.0
+
+    def stop(self):
+        """停止采集线程并释放摄像头"""
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+
+
+class VideoFileSource:
+    """逐帧读取录制好的视频文件，不丢帧，便于复现测量"""
+
+    def __init__(self, path):
+        self.path = path
+        self.cap = None
+        self._start_time = 0.0
+        self.captured_frames = 0
+        self.dropped_frames = 0
+
+    def start(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            print(f"无法打开视频文件: {self.path}")
+            return False
+        self._start_time = time.time()
+        return True
+
+    def read(self, timeout=1.0):
+        ret, frame = self.cap.read()
+        if ret:
+            self.captured_frames += 1
+        return ret, frame
+
+    @property
+    def capture_fps(self):
+        elapsed = time.time() - self._start_time
+        return self.captured_frames / elapsed if elapsed > 0 else 0.0
+
+    def stop(self):
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirSource:
+    """按文件名顺序读取目录中的图片作为视频帧"""
+
+    IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.paths = []
+        self._index = 0
+        self._start_time = 0.0
+        self.captured_frames = 0
+        self.dropped_frames = 0
+
+    def start(self):
+        if not os.path.isdir(self.directory):
+            print(f"图片目录不存在: {self.directory}")
+            return False
+        self.paths = [os.path.join(self.directory, f) for f in sorted(os.listdir(self.directory))
+                      if f.lower().endswith(self.IMAGE_EXTENSIONS)]
+        self._index = 0
+        self._start_time = time.time()
+        return True
+
+    def read(self, timeout=1.0):
+        while self._index < len(self.paths):
+            frame = cv2.imread(self.paths[self._index])
+            self._index += 1
+            if frame is not None:
+                self.captured_frames += 1
+                return True, frame
+        return False, None
+
+    @property
+    def capture_fps(self):
+        elapsed = time.time() - self._start_time
+        return self.captured_frames / elapsed if elapsed > 0 else 0.0
+
+    def stop(self):
+        pass
+
+
+def open_frame_source(source):
+    """根据 source 创建帧源：摄像头编号 -> CameraStream，目录 -> ImageDirSource，其余视为视频文件"""
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return CameraStream(int(source))
+    if os.path.isdir(source):
+        return ImageDirSource(source)
+    return VideoFileSource(source)
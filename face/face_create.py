@@ -1,44 +1,152 @@
-import numpy as np
+import sys
 import os
-import pickle
+sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
+import numpy as np
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import face_recognition
+from face.face_db import save_face_db, faiss_index_path
+from face.face_gallery import FaissFaceGallery, FAISS_INDEX_KINDS
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_manifest(manifest_path):
+    """读取人脸清单 faces.json，每个名字对应单张、多张图片或一个图片目录"""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    known_faces = {}
+    for name, image_paths in manifest.items():
+        if isinstance(image_paths, str):  # 单张图片或目录
+            image_paths = [image_paths]
+        paths = []
+        for image_path in image_paths:
+            if not os.path.isabs(image_path):
+                image_path = os.path.join(base_dir, image_path)
+            if os.path.isdir(image_path):
+                paths.extend(_list_images(image_path))
+            else:
+                paths.append(image_path)
+        known_faces[name] = paths
+    return known_faces
+
+
+def scan_image_dir(image_dir):
+    """扫描图片目录：images/<名字>/*.jpg 或 images/<名字>.jpg"""
+    known_faces = {}
+    for entry in sorted(os.listdir(image_dir)):
+        path = os.path.join(image_dir, entry)
+        if os.path.isdir(path):
+            images = _list_images(path)
+            if images:
+                known_faces[entry] = images
+        elif entry.lower().endswith(IMAGE_EXTENSIONS):
+            known_faces.setdefault(os.path.splitext(entry)[0], []).append(path)
+    return known_faces
+
+
+def _list_images(directory):
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+            if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def file_hash(path):
+    """按图片内容计算哈希，作为特征缓存的键"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def encode_image(image_path):
+    """加载图片并提取第一张人脸的特征，没有人脸时返回None（在进程池中执行）"""
+    image = face_recognition.load_image_file(image_path)
+    face_locations = face_recognition.face_locations(image)
+    if len(face_locations) == 0:
+        return None
+    return face_recognition.face_encodings(image, face_locations)[0]
+
+
+class EncodingCache:
+    """按图片内容哈希缓存特征，重复录入时只对新图片提取特征"""
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        if cache_path and os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                # 空数组表示该图片中没有检测到人脸
+                self.entries = {key: (data[key] if data[key].size else None) for key in data.files}
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        return self.entries.get(key)
 
-# 配置已知人脸数据集，每个名字对应单张或多张图片路径
-known_faces = {
-    "wudawang": ["face_recognition/images/wudawang/1.jpg", "face_recognition/images/wudawang/2.jpg"],  # 多张图片
-    "jiazhuo": ["face_recognition/images/jiazhuo/1.jpg",  "face_recognition/images/jiazhuo/2.jpg"], 
-    "yuhui": "face_recognition/images/yuhui.jpg",
-    "yihao": "face_recognition/images/yihao.jpg",  
-    "yianhao": "face_recognition/images/jianhao.jpg"}
+    def put(self, key, encoding):
+        self.entries[key] = encoding
+
+    def save(self, keep_keys=None):
+        """保存缓存，keep_keys 不为空时清除已不再使用的图片"""
+        if not self.cache_path:
+            return
+        if keep_keys is not None:
+            self.entries = {k: v for k, v in self.entries.items() if k in keep_keys}
+        arrays = {k: (np.asarray(v, dtype=np.float64) if v is not None else np.empty(0))
+                  for k, v in self.entries.items()}
+        with open(self.cache_path, "wb") as f:
+            np.savez(f, **arrays)
+
+
+def train_face_model(manifest_path="faces.json", image_dir=None, output_path="face/face_model.npy",
+                     cache_path="face/encoding_cache.npz", workers=None, index_kind=None):
+    """录入人脸：读取清单或图片目录，用进程池并行提取特征，已缓存的图片直接复用"""
+    known_faces = scan_image_dir(image_dir) if image_dir else load_manifest(manifest_path)
+    cache = EncodingCache(cache_path)
+
+    # 计算所有图片的内容哈希，找出未缓存的图片
+    image_hashes = {}
+    pending = {}
+    for name, image_paths in known_faces.items():
+        for image_path in image_paths:
+            if not os.path.exists(image_path):
+                print(f"Warning: {image_path} not found!")
+                continue
+            key = file_hash(image_path)
+            image_hashes[image_path] = key
+            if key not in cache and key not in pending:
+                pending[key] = image_path
+
+    print(f"共 {len(image_hashes)} 张图片，其中 {len(pending)} 张需要提取特征")
+
+    # 并行提取新图片的特征
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            keys = list(pending.keys())
+            for key, encoding in zip(keys, executor.map(encode_image, [pending[k] for k in keys])):
+                cache.put(key, encoding)
 
-def train_face_model():
     Encodings = []
     Names = []
-    
-    # 遍历已知人脸数据集
+
     for name, image_paths in known_faces.items():
-        if isinstance(image_paths, str):  # 单张图片
-            image_paths = [image_paths]  # 转换为列表
-        
         all_encodings = []
-        
-        # 遍历所有图片路径进行特征提取
         for image_path in image_paths:
-            if not os.path.exists(image_path):
-                print(f"Warning: {image_path} not found!")
+            key = image_hashes.get(image_path)
+            if key is None:
                 continue
-            
-            # 加载图片并提取特征
-            image = face_recognition.load_image_file(image_path)
-            face_locations = face_recognition.face_locations(image)
-            if len(face_locations) == 0:
+            encoding = cache.get(key)
+            if encoding is None:
                 print(f"No face found in {image_path}!")
                 continue
-            
-            # 提取人脸特征编码
-            encoding = face_recognition.face_encodings(image, face_locations)[0]
             all_encodings.append(encoding)
-        
+
         # 如果提取了多张图片的特征，则取特征的平均值
         if all_encodings:
             average_encoding = np.mean(all_encodings, axis=0)
@@ -47,14 +155,33 @@ def train_face_model():
             print(f"Processed {name} successfully")
         else:
             print(f"No valid encodings found for {name}")
-    
-    # 将人名和特征一一对应存入字典中
-    face_database = dict(zip(Names, Encodings))
 
-    # 保存训练模型
-    with open('face_recognition/face_model.pkl', 'wb') as f:
-        pickle.dump(face_database, f)  # 保存字典
+    cache.save(keep_keys=set(image_hashes.values()))
+
+    # 保存为 float32 特征矩阵 + 名字清单，识别端可内存映射加载
+    save_face_db(output_path, Names, Encodings)
+
+    # 可选：为大规模人脸库构建FAISS近似检索索引
+    index_path = faiss_index_path(output_path)
+    if index_kind and Encodings:
+        gallery = FaissFaceGallery.build(Names, np.asarray(Encodings, dtype=np.float32).reshape(-1, 128), index_kind)
+        gallery.save(index_path)
+        print(f"FAISS {index_kind} 索引已保存: {index_path}")
+    elif os.path.exists(index_path):
+        # 旧索引与新的人脸库不再对应
+        os.remove(index_path)
     print("Model training completed")
+    return dict(zip(Names, Encodings))
+
 
 if __name__ == "__main__":
-    train_face_model()
+    parser = argparse.ArgumentParser(description="人脸录入")
+    parser.add_argument("--manifest", default="faces.json", help="人脸清单JSON文件")
+    parser.add_argument("--image-dir", default=None, help="图片目录，优先于清单使用")
+    parser.add_argument("--output", default="face/face_model.npy", help="人脸数据库输出路径")
+    parser.add_argument("--cache", default="face/encoding_cache.npz", help="特征缓存路径")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument("--index", choices=FAISS_INDEX_KINDS, default=None, help="同时构建FAISS人脸索引")
+    args = parser.parse_args()
+
+    train_face_model(args.manifest, args.image_dir, args.output, args.cache, args.workers, args.index)
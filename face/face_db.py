@@ -0,0 +1,78 @@
+import os
+import json
+import pickle
+import argparse
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def sidecar_path(db_path):
+    """特征矩阵 xxx.npy 对应的名字/元数据文件 xxx.json"""
+    return os.path.splitext(db_path)[0] + ".json"
+
+
+def faiss_index_path(db_path):
+    """特征矩阵 xxx.npy 对应的FAISS索引文件 xxx.faiss"""
+    return os.path.splitext(db_path)[0] + ".faiss"
+
+
+def save_face_db(db_path, names, encodings, metadata=None):
+    """保存人脸库：float32特征矩阵写入 .npy，名字和元数据写入同名 .json"""
+    encodings = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32))
+    if encodings.size == 0:
+        encodings = encodings.reshape(0, 128)
+    names = list(names)
+    if len(names) != len(encodings):
+        raise ValueError(f"名字数量({len(names)})与特征数量({len(encodings)})不一致")
+
+    # 先写临时文件再替换，避免识别进程读到写了一半的库
+    tmp_path = db_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, encodings)
+    os.replace(tmp_path, db_path)
+
+    sidecar = {
+        "version": FORMAT_VERSION,
+        "count": len(names),
+        "dim": int(encodings.shape[1]),
+        "dtype": "float32",
+        "names": names,
+        "metadata": metadata or {},
+    }
+    tmp_path = sidecar_path(db_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, sidecar_path(db_path))
+
+
+def load_face_db(db_path, mmap=True):
+    """加载人脸库，返回 (名字列表, 特征矩阵, 元数据)；mmap=True 时特征矩阵零拷贝内存映射"""
+    with open(sidecar_path(db_path), "r", encoding="utf-8") as f:
+        sidecar = json.load(f)
+
+    encodings = np.load(db_path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    names = sidecar["names"]
+    if encodings.dtype != np.float32 or encodings.ndim != 2:
+        raise ValueError(f"人脸库格式错误: dtype={encodings.dtype}, shape={encodings.shape}")
+    if len(names) != len(encodings):
+        raise ValueError(f"人脸库损坏: 名字数量({len(names)})与特征数量({len(encodings)})不一致")
+    return names, encodings, sidecar.get("metadata", {})
+
+
+def convert_pickle(pickle_path, db_path):
+    """把旧版 pickle 字典 {名字: 特征} 转换为 .npy + .json 格式"""
+    with open(pickle_path, "rb") as f:
+        known_faces = pickle.load(f)
+    save_face_db(db_path, list(known_faces.keys()), list(known_faces.values()),
+                 metadata={"converted_from": os.path.basename(pickle_path)})
+    print(f"已转换 {len(known_faces)} 个人脸模型: {pickle_path} -> {db_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把旧版 pickle 人脸库转换为内存映射格式")
+    parser.add_argument("pickle_path", nargs="?", default="face/face_model.pkl", help="旧版pickle人脸库")
+    parser.add_argument("db_path", nargs="?", default="face/face_model.npy", help="输出的 .npy 人脸库")
+    args = parser.parse_args()
+
+    convert_pickle(args.pickle_path, args.db_path)
@@ -0,0 +1,63 @@
+class EvidenceAccumulator:
+    """单条人脸轨迹的跨帧证据累积
+
+    每帧把最近邻距离换算成一个有符号的证据值：距离越小于阈值越支持“是此人”，
+    越大于阈值越支持“不认识”。支持某人的证据累计到 accept_score 即接受，
+    不匹配的证据累计到 reject_score 即拒绝，两种判定都能在少数几帧内完成。
+    距离不超过 tolerance - 2*margin 的样本足够可靠，一帧即可接受；不超过 tolerance 的样本至少给出
+    min_support 的支持，持续落在阈值内的人脸最终都会被接受；略大于阈值的模糊样本还会额外增加不匹配证据，
+    这样的人脸会被提前拒绝而不是一直等到超时
+    """
+
+    def __init__(self, tolerance=0.4, margin=0.1, accept_score=1.5, reject_score=3.0,
+                 decay=0.9, max_step=1.0, dead_band_weight=0.5):
+        self.tolerance = tolerance  # 证据为零的距离
+        self.margin = margin  # 距离每偏离阈值一个margin，证据变化1
+        self.accept_score = accept_score
+        self.reject_score = reject_score
+        self.decay = decay  # 旧证据的衰减系数，避免很久以前的帧主导判定
+        self.max_step = max_step  # 单帧证据上限，防止一帧异常值直接定案
+        self.strong_distance = tolerance - 2 * margin  # 不超过该距离的样本单帧即可接受
+        self.dead_band_weight = dead_band_weight  # 略大于阈值的模糊样本带来的额外不匹配证据（越接近阈值越多）
+        self.min_support = 2 * accept_score * (1 - decay)  # 阈值内样本的最小支持，衰减后仍能累计到 accept_score
+        self.scores = {}  # 名字 -> 支持证据
+        self.mismatch = 0.0  # 不匹配证据
+        self.frames = 0
+
+    def update(self, name, distance):
+        """加入一帧的最近邻结果 (名字, 距离)"""
+        self.frames += 1
+        step = (self.tolerance - distance) / self.margin
+        if name is not None and distance <= self.strong_distance:
+            step = max(step, self.accept_score)
+        else:
+            step = max(-self.max_step, min(self.max_step, step))
+            if name is not None and distance <= self.tolerance:
+                step = max(step, self.min_support)
+
+        for key in self.scores:
+            self.scores[key] *= self.decay
+        self.mismatch *= self.decay
+
+        if step > 0 and name is not None:
+            self.scores[name] = self.scores.get(name, 0.0) + step
+        else:
+            self.mismatch -= step
+        if distance > self.tolerance and abs(step) < 1.0:
+            self.mismatch += (1.0 - abs(step)) * self.dead_band_weight
+
+    def best(self):
+        """返回证据最多的 (名字, 证据)"""
+        if not self.scores:
+            return None, 0.0
+        name = max(self.scores, key=self.scores.get)
+        return name, self.scores[name]
+
+    def decision(self):
+        """返回 ("accept", 名字)、("reject", None) 或 (None, None)"""
+        name, score = self.best()
+        if score >= self.accept_score:
+            return "accept", name
+        if self.mismatch >= self.reject_score:
+            return "reject", None
+        return None, None
@@ -0,0 +1,144 @@
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # FAISS 为可选依赖，未安装时只能使用 numpy 暴力匹配
+    faiss = None
+
+FAISS_INDEX_KINDS = ("flat", "ivf", "hnsw")
+
+
+class FaceGallery:
+    """人脸库索引：连续的float32特征矩阵 + 对应名字数组 + 预计算的平方范数
+
+    在加载人脸库时构建一次，之后每一帧的所有人脸只需一次向量化的距离计算即可完成匹配
+    """
+
+    def __init__(self, names, encodings, dim=128):
+        self.dim = dim
+        self.names = np.asarray(list(names), dtype=object)
+        encodings = np.asarray(encodings, dtype=np.float32)
+        if encodings.size == 0:
+            encodings = np.empty((0, dim), dtype=np.float32)
+        self.encodings = np.ascontiguousarray(encodings.reshape(-1, dim))
+        if len(self.names) != len(self.encodings):
+            raise ValueError(f"名字数量({len(self.names)})与特征数量({len(self.encodings)})不一致")
+        # ||e||^2，查询时用 ||q-e||^2 = ||q||^2 + ||e||^2 - 2 q·e
+        self.sq_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+    @classmethod
+    def from_dict(cls, known_faces, dim=128):
+        """从 {名字: 特征} 字典构建索引"""
+        return cls(known_faces.keys(), list(known_faces.values()), dim=dim)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _as_queries(self, queries):
+        queries = np.asarray(queries, dtype=np.float32)
+        return queries.reshape(-1, self.dim)
+
+    def distances(self, queries):
+        """返回 (查询数, 人脸库大小) 的欧氏距离矩阵"""
+        queries = self._as_queries(queries)
+        q_sq = np.einsum("ij,ij->i", queries, queries)
+        d2 = q_sq[:, None] + self.sq_norms[None, :] - 2.0 * (queries @ self.encodings.T)
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2, out=d2)
+
+    def query(self, queries, k=1):
+        """批量top-k查询，返回 (索引, 距离)，形状均为 (查询数, k)，按距离升序"""
+        queries = self._as_queries(queries)
+        n = len(self)
+        k = min(k, n)
+        if k == 0 or len(queries) == 0:
+            return (np.empty((len(queries), 0), dtype=np.int64),
+                    np.empty((len(queries), 0), dtype=np.float32))
+
+        dists = self.distances(queries)
+        if k < n:
+            idx = np.argpartition(dists, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.broadcast_to(np.arange(n), (len(queries), n)).copy()
+        part = np.take_along_axis(dists, idx, axis=1)
+        order = np.argsort(part, axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        return idx, np.take_along_axis(part, order, axis=1)
+
+    def match(self, queries, tolerance=0.4):
+        """对每个查询返回 (名字, 距离)，最近距离超过阈值时名字为None"""
+        idx, dists = self.query(queries, k=1)
+        results = []
+        for row_idx, row_dist in zip(idx, dists):
+            found = len(row_idx) > 0 and row_idx[0] >= 0
+            if found and row_dist[0] <= tolerance:
+                results.append((self.names[row_idx[0]], float(row_dist[0])))
+            else:
+                results.append((None, float(row_dist[0]) if found else float("inf")))
+        return results
+
+
+def build_faiss_index(encodings, kind="flat", nlist=100, hnsw_m=32):
+    """为人脸特征构建FAISS索引：flat(精确)、ivf(倒排)或hnsw(图索引)"""
+    if faiss is None:
+        raise ImportError("使用FAISS人脸索引需要先安装 faiss-cpu")
+    encodings = np.ascontiguousarray(encodings, dtype=np.float32)
+    dim = encodings.shape[1]
+
+    if kind == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif kind == "ivf":
+        nlist = max(1, min(nlist, len(encodings)))
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        index.train(encodings)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+    else:
+        raise ValueError(f"不支持的FAISS索引类型: {kind}，可选 {FAISS_INDEX_KINDS}")
+
+    index.add(encodings)
+    return index
+
+
+class FaissFaceGallery(FaceGallery):
+    """FAISS近似最近邻人脸库，接口与 FaceGallery 相同，适合大规模人脸库"""
+
+    def __init__(self, names, encodings, index, dim=128, nprobe=8, ef_search=64):
+        super().__init__(names, encodings, dim=dim)
+        if index.ntotal != len(self.names):
+            raise ValueError(f"FAISS索引数量({index.ntotal})与人脸库数量({len(self.names)})不一致")
+        self.index = index
+        # 查询精度/速度的折中参数
+        if hasattr(index, "nprobe"):
+            index.nprobe = nprobe
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = ef_search
+
+    @classmethod
+    def build(cls, names, encodings, kind="flat", dim=128, **kwargs):
+        """直接从特征矩阵构建"""
+        return cls(names, encodings, build_faiss_index(encodings, kind), dim=dim, **kwargs)
+
+    @classmethod
+    def load(cls, index_path, names, encodings, dim=128, **kwargs):
+        """从录入时保存的索引文件加载"""
+        if faiss is None:
+            raise ImportError("使用FAISS人脸索引需要先安装 faiss-cpu")
+        return cls(names, encodings, faiss.read_index(index_path), dim=dim, **kwargs)
+
+    def save(self, index_path):
+        faiss.write_index(self.index, index_path)
+
+    def query(self, queries, k=1):
+        """批量top-k查询，返回 (索引, 距离)，找不到的位置索引为-1、距离为inf"""
+        queries = np.ascontiguousarray(self._as_queries(queries))
+        k = min(k, len(self))
+        if k == 0 or len(queries) == 0:
+            return (np.empty((len(queries), 0), dtype=np.int64),
+                    np.empty((len(queries), 0), dtype=np.float32))
+
+        d2, idx = self.index.search(queries, k)  # FAISS返回的是平方距离
+        dists = np.sqrt(np.maximum(d2, 0.0))
+        dists[idx < 0] = np.inf
+        return idx, dists
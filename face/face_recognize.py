@@ -1,20 +1,50 @@
 import sys
 import os
 sys.path.append(os.path.abspath("/home/wuye/vscode/chatbox"))
+import asyncio
 import cv2
 import face_recognition
 import numpy as np
 import time
+import json
 import pickle
 import os
+from face.face_gallery import FaceGallery, FaissFaceGallery, faiss
+from face.camera import open_frame_source
+from face.face_db import load_face_db, faiss_index_path
+from face.face_evidence import EvidenceAccumulator
+from face.face_tracker import FaceTracker
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 class FaceRecognizer:
-    def __init__(self, face_model_path="face/face_model.pkl", timeout=10):
+    def __init__(self, face_model_path="face/face_model.npy", timeout=10, tolerance=0.4,
+                 detect_scale=0.5, detect_every=2, detector_model="hog", num_jitters=1,
+                 source=0, headless=False, accept_score=1.5, reject_score=3.0, evidence_margin=0.1,
+                 reencode_every=3, full_detect_every=5, roi_margin=0.5, index_backend="auto"):
+        # 构造参数，独立进程认证时只传这些配置，由工作进程自己加载人脸库
+        self.config = {k: v for k, v in locals().items() if k != "self"}
         self.face_model_path = face_model_path
         self.timeout = timeout
-        self.known_faces = {}
+        self.tolerance = tolerance  # 证据为零的距离：更近支持接受，更远支持拒绝
+        self.accept_score = accept_score  # 跨帧累计证据达到该值即认证成功
+        self.reject_score = reject_score  # 不匹配证据达到该值即放弃该人脸
+        self.evidence_margin = evidence_margin
+        self.detect_scale = detect_scale  # 在缩小后的帧上做人脸检测
+        self.detect_every = max(1, detect_every)  # 每N帧检测一次，其余帧沿用上次的人脸框
+        self.detector_model = detector_model  # "hog"(CPU) 或 "cnn"(GPU)
+        self.num_jitters = num_jitters  # 提取特征时的重采样次数，越大越准越慢
+        self.full_detect_every = max(1, full_detect_every)  # 每N次检测做一次全图检测，其余只检测已知轨迹周围
+        self.roi_margin = roi_margin  # 轨迹检测区域向外扩展的比例（相对人脸框尺寸）
+        self.tracker = FaceTracker(reencode_every=reencode_every)
+        self.source = source  # 摄像头编号、视频文件或图片目录
+        self.headless = headless  # 无界面模式，不调用 imshow/waitKey
+        self.index_backend = index_backend  # "numpy"、"faiss"，或 "auto"（存在FAISS索引文件时使用）
+        self.gallery = None
         self.recognized_user = None
+        self.fps = 0.0
+        self.stats = {}  # 最近一次认证的各阶段耗时统计
         
     def initialize(self):
         """初始化人脸识别器"""
@@ -29,29 +59,102 @@ class FaceRecognizer:
     def _load_face_model(self):
         """加载人脸数据库"""
         try:
-            with open(self.face_model_path, "rb") as f:
-                self.known_faces = pickle.load(f)
-            print(f"成功加载人脸数据库！共有{len(self.known_faces)}个人脸模型")
+            if self.face_model_path.endswith(".pkl"):
+                # 旧版pickle格式，建议用 face/face_db.py 转换
+                print("⚠️ 正在加载旧版pickle人脸库，请使用 python face/face_db.py 转换为 .npy 格式")
+                with open(self.face_model_path, "rb") as f:
+                    known_faces = pickle.load(f)
+                self.gallery = FaceGallery.from_dict(known_faces)
+            else:
+                # 特征矩阵内存映射，只构建一次索引，识别时不再逐帧重建列表
+                names, encodings, _ = load_face_db(self.face_model_path)
+                self.gallery = self._build_gallery(names, encodings)
+            print(f"成功加载人脸数据库！共有{len(self.gallery)}个人脸模型")
         except FileNotFoundError:
             print(f"未找到人脸数据库文件: {self.face_model_path}")
             raise
 
+    def _build_gallery(self, names, encodings):
+        """按配置选择 numpy 暴力匹配或录入时生成的FAISS索引"""
+        dim = encodings.shape[1]
+        index_path = faiss_index_path(self.face_model_path)
+        if self.index_backend == "numpy":
+            return FaceGallery(names, encodings, dim=dim)
+        if faiss is not None and os.path.exists(index_path):
+            try:
+                gallery = FaissFaceGallery.load(index_path, names, encodings, dim=dim)
+                print(f"使用FAISS人脸索引: {index_path}")
+                return gallery
+            except ValueError as e:
+                # 索引与人脸库不一致（例如只更新了 .npy），退回暴力匹配
+                print(f"⚠️ FAISS人脸索引不可用: {e}")
+        elif self.index_backend == "faiss":
+            print(f"⚠️ 未安装faiss或未找到索引文件 {index_path}，使用numpy暴力匹配")
+        return FaceGallery(names, encodings, dim=dim)
+
+    def _detect_faces(self, rgb_frame, region=None):
+        """在缩小的帧（或其中的区域）上检测人脸，并把人脸框映射回原始分辨率"""
+        offset_y, offset_x = 0, 0
+        if region is not None:
+            top, right, bottom, left = region
+            rgb_frame = rgb_frame[top:bottom, left:right]
+            offset_y, offset_x = top, left
+        
+        scale = self.detect_scale
+        if scale < 1.0:
+            detect_frame = cv2.resize(rgb_frame, (0, 0), fx=scale, fy=scale)
+        else:
+            detect_frame, scale = rgb_frame, 1.0
+        
+        height, width = rgb_frame.shape[:2]
+        locations = []
+        for top, right, bottom, left in face_recognition.face_locations(detect_frame, model=self.detector_model):
+            locations.append((
+                max(0, int(top / scale)) + offset_y,
+                min(width, int(right / scale)) + offset_x,
+                min(height, int(bottom / scale)) + offset_y,
+                max(0, int(left / scale)) + offset_x,
+            ))
+        return locations
+
+    def _encode_tracks(self, rgb_frame, tracks, detection):
+        """只为需要的轨迹（新出现、明显移动或未判定且到了重提间隔）提取特征，返回本帧新提取的轨迹"""
+        pending = [
+            t for t in tracks
+            if self.tracker.needs_encoding(
+                t, detection, settled=t.evidence is not None and t.evidence.decision()[0] is not None)
+        ]
+        if pending:
+            encodings = face_recognition.face_encodings(
+                rgb_frame, [t.box for t in pending], num_jitters=self.num_jitters
+            )
+            for track, encoding in zip(pending, encodings):
+                self.tracker.set_encoding(track, encoding, detection)
+        return pending
+
     def recognize_face(self):
         """执行人脸认证过程，返回识别结果和用户名"""
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            print("无法打开摄像头")
+        # 摄像头由后台线程采集，识别循环只取最新帧；视频/图片目录逐帧读取
+        source = open_frame_source(self.source)
+        if not source.start():
             return False, None
         
         print("📸 开始人脸认证...")
         
         start_time = time.time()
         auth_success = False
+        frame_count = 0
+        tracks = []
+        detect_count = 0
+        self.tracker.reset()
+        auth_rejected = False
+        stage_times = {"detect": 0.0, "encode": 0.0, "match": 0.0}
+        first_match_time = None
         
         try:
             while time.time() - start_time < self.timeout:
-                # 读取一帧视频
-                ret, frame = cap.read()
+                # 读取最新一帧视频
+                ret, frame = source.read()
                 if not ret:
                     print("无法获取视频帧")
                     break
@@ -59,42 +162,78 @@ class FaceRecognizer:
                 # 转换为RGB格式用于face_recognition库
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 
-                # 人脸检测和识别
-                face_locations = face_recognition.face_locations(rgb_frame)
-                if not face_locations:
+                # 人脸检测：每N帧在缩小的帧上检测一次，已有轨迹时只检测轨迹附近区域
+                frame_index = frame_count
+                frame_count += 1
+                if frame_index % self.detect_every == 0:
+                    t0 = time.perf_counter()
+                    region = None
+                    if detect_count % self.full_detect_every != 0:
+                        region = self.tracker.search_region(rgb_frame.shape, self.roi_margin)
+                    face_locations = self._detect_faces(rgb_frame, region)
+                    if region is not None and not face_locations:
+                        # 轨迹附近没找到人脸，退回全图检测
+                        face_locations = self._detect_faces(rgb_frame)
+                    detect_count += 1
+                    tracks = self.tracker.update(face_locations, frame_index)
+                    stage_times["detect"] += time.perf_counter() - t0
+                
+                if not tracks:
                     # 如果没有检测到人脸，显示提示
-                    cv2.putText(frame, "No Face Detected", (10, 30), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                    if not self.headless:
+                        cv2.putText(frame, "No Face Detected", (10, 30), 
+                                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
                 else:
-                    # 检测到人脸，执行识别
-                    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+                    # 检测到人脸，只为需要的轨迹提取特征
+                    t0 = time.perf_counter()
+                    fresh_tracks = self._encode_tracks(rgb_frame, tracks, detect_count)
+                    t1 = time.perf_counter()
+                    
+                    # 一次向量化计算新特征的最近邻（不设阈值，交给证据累积判定）
+                    if fresh_tracks:
+                        matches = self.gallery.match([t.encoding for t in fresh_tracks], tolerance=float("inf"))
+                        for track, (candidate, distance) in zip(fresh_tracks, matches):
+                            if track.evidence is None:
+                                track.evidence = EvidenceAccumulator(
+                                    tolerance=self.tolerance, margin=self.evidence_margin,
+                                    accept_score=self.accept_score, reject_score=self.reject_score)
+                            track.evidence.update(candidate, distance)
+                    stage_times["encode"] += t1 - t0
+                    stage_times["match"] += time.perf_counter() - t1
                     
-                    for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                        # 与已知人脸比较
-                        matches = face_recognition.compare_faces(
-                            list(self.known_faces.values()), face_encoding, tolerance=0.4
-                        )
-                        name = "who?"
+                    decisions = []
+                    for track in tracks:
+                        top, right, bottom, left = track.box
+                        evidence = track.evidence
+                        decision, match_name = evidence.decision()
+                        decisions.append(decision)
+                        
+                        name = "who?" if decision == "reject" else "..."
                         color = (0, 0, 255)  # 红色表示未识别
                         
-                        if True in matches:
-                            # 找到最佳匹配
-                            face_distances = face_recognition.face_distance(
-                                list(self.known_faces.values()), face_encoding
-                            )
-                            best_match_index = face_distances.argmin()
-                            
-                            if face_distances[best_match_index] < 0.5:
-                                name = list(self.known_faces.keys())[best_match_index]
-                                color = (0, 255, 0)  # 绿色表示已识别
-                                self.recognized_user = name
-                                auth_success = True
-                                print(f"✅ 已识别用户: {name}")
+                        if decision == "accept":
+                            name = match_name
+                            color = (0, 255, 0)  # 绿色表示已识别
+                            self.recognized_user = name
+                            auth_success = True
+                            if first_match_time is None:
+                                first_match_time = time.time() - start_time
+                            print(f"✅ 已识别用户: {name}（{evidence.frames}帧）")
                         
                         # 在图像上绘制人脸框和名称
-                        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-                        cv2.putText(frame, name, (left, top - 10), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
+                        if not self.headless:
+                            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+                            cv2.putText(frame, name, (left, top - 10), 
+                                        cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
+                    
+                    # 画面中所有人脸都已被判定为不认识，提前结束
+                    if not auth_success and all(d == "reject" for d in decisions):
+                        auth_rejected = True
+                
+                if self.headless:
+                    if auth_success or auth_rejected:
+                        break
+                    continue
                 
                 # 显示剩余时间
                 remaining = int(self.timeout - (time.time() - start_time))
@@ -104,8 +243,8 @@ class FaceRecognizer:
                 # 显示图像
                 cv2.imshow('Face recognition', frame)
                 
-                # 如果认证成功，停止循环
-                if auth_success:
+                # 如果认证成功或已判定不认识，停止循环
+                if auth_success or auth_rejected:
                     # 显示成功信息2秒后继续
                     # cv2.putText(frame, f"{name}", (frame.shape[1]//4, frame.shape[0]//2), 
                     #             cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
@@ -118,16 +257,64 @@ class FaceRecognizer:
                     break
             
             # 如果超时未识别
-            if not auth_success:
+            if auth_rejected:
+                print("❌ 多帧比对均不匹配，未能识别用户")
+            elif not auth_success:
                 print("❌ 认证超时，未能识别用户")
+            
+            elapsed = time.time() - start_time
+            self.fps = frame_count / elapsed if elapsed > 0 else 0.0
+            self.stats = {
+                "frames": frame_count,
+                "elapsed": elapsed,
+                "fps": self.fps,
+                "capture_fps": source.capture_fps,
+                "dropped_frames": source.dropped_frames,
+                "time_to_first_match": first_match_time,
+                **{f"{stage}_time": t for stage, t in stage_times.items()},
+            }
+            print(f"📈 识别 {frame_count} 帧，平均 {self.fps:.1f} FPS，用时 {elapsed:.2f}秒")
+            print(f"📷 采集 {source.captured_frames} 帧，{source.capture_fps:.1f} FPS，丢弃过期帧 {source.dropped_frames}")
         
         finally:
             # 释放资源
-            cap.release()
-            cv2.destroyAllWindows()
+            source.stop()
+            if not self.headless:
+                cv2.destroyAllWindows()
         
         return auth_success, self.recognized_user
 
+    async def recognize_face_async(self):
+        """在独立进程中执行人脸认证，事件循环保持空闲，可同时加载其他模型
+
+        子进程从 face/face_worker.py 这个小入口启动，只传构造参数，由子进程自己加载人脸库：
+        不 fork（其他线程正在加载模型并持有各种锁），也不像 spawn 那样重新导入主程序。
+        人脸库加载失败时抛出 RuntimeError
+        """
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")]))
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "face.face_worker",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, env=env
+        )
+        try:
+            output, _ = await process.communicate(json.dumps(self.config).encode("utf-8"))
+        except BaseException:
+            # 等待方被取消时一并结束子进程，释放摄像头
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if process.returncode != 0 or not output:
+            raise RuntimeError(f"人脸认证进程异常退出 (返回码 {process.returncode})")
+        result = json.loads(output)
+        if not result["initialized"]:
+            raise RuntimeError(f"人脸模型加载失败: {self.face_model_path}")
+        self.stats = result.get("stats", {})
+        if result["success"]:
+            self.recognized_user = result["user"]
+        return result["success"], result["user"]
+
     def get_recognized_user(self):
         """获取已识别的用户名"""
         return self.recognized_user
@@ -0,0 +1,116 @@
+def box_iou(a, b):
+    """两个 (top, right, bottom, left) 人脸框的交并比"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _center_distance(a, b):
+    """两个人脸框中心点的距离，按框尺寸归一化"""
+    ay, ax = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    by, bx = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    size = max(a[2] - a[0], a[1] - a[3], 1)
+    return ((ay - by) ** 2 + (ax - bx) ** 2) ** 0.5 / size
+
+
+class FaceTrack:
+    """一条人脸轨迹：跨帧保存人脸框、特征和证据"""
+
+    def __init__(self, track_id, box, frame_index):
+        self.track_id = track_id
+        self.box = box
+        self.last_seen = frame_index
+        self.encoding = None
+        self.encoded_box = None  # 上次提取特征时的人脸框
+        self.encoded_at = -1  # 上次提取特征时是第几次检测
+        self.evidence = None
+
+
+class FaceTracker:
+    """基于IoU/中心点距离的轻量级人脸跟踪器
+
+    在检测和特征提取之间关联相邻帧的人脸框：静止的人脸不必每次检测都重新提取特征，
+    还没判定的轨迹每隔几次检测或明显移动时重新提取，已判定的轨迹只在明显移动时重新提取，
+    并给出已知轨迹周围的检测区域
+    """
+
+    def __init__(self, iou_threshold=0.3, center_threshold=0.5, max_missed=5,
+                 reencode_every=3, reencode_iou=0.6):
+        self.iou_threshold = iou_threshold
+        self.center_threshold = center_threshold  # IoU不足时，中心距离小于框尺寸的该比例也视为同一人
+        self.max_missed = max_missed  # 连续多少帧未检测到就删除轨迹
+        self.reencode_every = max(1, reencode_every)  # 未判定的静止轨迹每隔N次检测重新提取特征
+        self.reencode_iou = reencode_iou  # 与上次提取特征时的人脸框IoU低于该值就重新提取
+        self.tracks = []
+        self._next_id = 0
+
+    def reset(self):
+        self.tracks = []
+        self._next_id = 0
+
+    def update(self, boxes, frame_index):
+        """把本帧检测到的人脸框关联到轨迹，返回与 boxes 一一对应的轨迹列表"""
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for bi, box in enumerate(boxes):
+                iou = box_iou(track.box, box)
+                if iou >= self.iou_threshold:
+                    pairs.append((1.0 + iou, ti, bi))
+                elif _center_distance(track.box, box) <= self.center_threshold:
+                    pairs.append((1.0 - _center_distance(track.box, box), ti, bi))
+
+        # 贪心匹配：得分高的先配对
+        assigned = [None] * len(boxes)
+        used_tracks = set()
+        for _, ti, bi in sorted(pairs, reverse=True):
+            if ti in used_tracks or assigned[bi] is not None:
+                continue
+            track = self.tracks[ti]
+            track.box = boxes[bi]
+            track.last_seen = frame_index
+            assigned[bi] = track
+            used_tracks.add(ti)
+
+        for bi, box in enumerate(boxes):
+            if assigned[bi] is None:
+                track = FaceTrack(self._next_id, box, frame_index)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[bi] = track
+
+        self.tracks = [t for t in self.tracks if frame_index - t.last_seen <= self.max_missed]
+        return assigned
+
+    def needs_encoding(self, track, detection, settled=False):
+        """判断轨迹在第 detection 次检测后是否需要提取特征；已判定(settled)的轨迹只在明显移动时重新提取"""
+        if track.encoding is None:
+            return True
+        if box_iou(track.encoded_box, track.box) < self.reencode_iou:
+            return True
+        return not settled and detection - track.encoded_at >= self.reencode_every
+
+    def set_encoding(self, track, encoding, detection):
+        track.encoding = encoding
+        track.encoded_box = track.box
+        track.encoded_at = detection
+
+    def search_region(self, frame_shape, margin=0.5):
+        """已知轨迹外扩 margin 倍框尺寸后的并集区域 (top, right, bottom, left)，没有轨迹时返回None"""
+        if not self.tracks:
+            return None
+        height, width = frame_shape[:2]
+        tops, rights, bottoms, lefts = [], [], [], []
+        for t in self.tracks:
+            top, right, bottom, left = t.box
+            pad_y = int((bottom - top) * margin)
+            pad_x = int((right - left) * margin)
+            tops.append(top - pad_y)
+            rights.append(right + pad_x)
+            bottoms.append(bottom + pad_y)
+            lefts.append(left - pad_x)
+        return (max(0, min(tops)), min(width, max(rights)),
+                min(height, max(bottoms)), max(0, min(lefts)))
@@ -0,0 +1,26 @@
+"""人脸认证工作进程入口：python -m face.face_worker
+
+从标准输入读取识别器配置（JSON），加载人脸库并执行认证，结果（JSON）写到标准输出。
+子进程只导入人脸识别相关的模块，不会像 multiprocessing 的 spawn 那样重新导入主程序
+（问答模型、语音识别、TTS），摄像头可以马上打开
+"""
+import sys
+import json
+
+
+def main():
+    config = json.load(sys.stdin)
+    result = sys.stdout
+    sys.stdout = sys.stderr  # 识别过程的输出都走stderr，stdout只留给结果
+
+    from face.face_recognize import FaceRecognizer
+    recognizer = FaceRecognizer(**config)
+    if not recognizer.initialize():
+        json.dump({"initialized": False, "success": False, "user": None}, result)
+        return
+    success, user = recognizer.recognize_face()
+    json.dump({"initialized": True, "success": success, "user": user, "stats": recognizer.stats}, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,16 @@ import asyncio
 import os
 import time
 import threading
-import pyaudio
-import edge_tts
 import subprocess
 import logging
 import re
 import webrtcvad
 import array
 import math
-from aip import AipSpeech
-
-# 百度API配置
-APP_ID = '118613302'
-API_KEY = '7hSl10mvmtaCndZoab0S3BXQ'
-SECRET_KEY = 'Fv10TxiFLmWb4UTAdLeA2eaTIE56QtkW'
-
-client = AipSpeech(APP_ID, API_KEY, SECRET_KEY)
+from ASR.audio_hub import get_microphone_hub
+from ASR.energy_gate import EnergyGate
+from ASR.resilient import ResilientASR, get_asr_requester
+from TTS.cache import get_tts_cache
 
 # 设置日志
 logging.basicConfig(
@@ -27,12 +21,14 @@ logging.basicConfig(
 )
 
 class SimpleInterruptibleTTS:
-    def __init__(self, voice="zh-CN-XiaoyiNeural", rate="+0%", volume="+0%"):
+    def __init__(self, voice="zh-CN-XiaoyiNeural", rate="+0%", volume="+0%", hub=None, backend=None):
         # TTS配置
         self.voice = voice
         self.rate = rate
         self.volume = volume
-        self.energy_threshold = 1000
+        
+        # 合成过的语音从共用缓存取，不重复请求 edge-tts
+        self.cache = get_tts_cache()
         
         # 中断控制
         self.is_speaking = False
@@ -40,11 +36,19 @@ class SimpleInterruptibleTTS:
         self.listen_thread = None
         self.playback_process = None
         
-        # 音频输入配置（固定为16kHz）
-        self.CHUNK = 320  # 20ms at 16kHz
-        self.FORMAT = pyaudio.paInt16
-        self.CHANNELS = 1
-        self.RATE = 16000
+        # 音频输入来自共享的麦克风采集中心（16kHz，每帧20ms）
+        self.hub = hub or get_microphone_hub()
+        self.CHUNK = self.hub.CHUNK
+        self.CHANNELS = self.hub.CHANNELS
+        self.RATE = self.hub.RATE
+        
+        # 语音识别请求层，与 ASRhelper 共用后端和熔断状态
+        self.requester = ResilientASR(backend) if backend else get_asr_requester()
+        self.backend = self.requester.backends[0]
+        
+        # 能量预筛选：安静时不调用VAD；播放中打断要求声音足够大，避免扬声器回声误触发
+        self.energy_gate = EnergyGate(self.RATE, self.CHUNK * 1000 // self.RATE, min_rms=1000)
+        self.input_gate = EnergyGate(self.RATE, self.CHUNK * 1000 // self.RATE)
         
         # 始终使用 VAD 级别 3（嘈杂环境）
         try:
@@ -54,8 +58,8 @@ class SimpleInterruptibleTTS:
             logging.error(f"初始化VAD失败: {e}")
             self.vad = None
         
-        # 初始化PyAudio
-        self.p = pyaudio.PyAudio()
+        # 订阅麦克风
+        self.hub.acquire()
         self.input_stream = None
         
         # 直接设置输入流
@@ -80,18 +84,11 @@ class SimpleInterruptibleTTS:
         return text
         
     def setup_input_stream(self):
-        """简化的音频输入流设置方法"""
+        """订阅共享麦克风"""
         if self.input_stream is None:
             try:
-                # 直接使用默认输入设备
-                self.input_stream = self.p.open(
-                    format=self.FORMAT,
-                    channels=self.CHANNELS,
-                    rate=self.RATE,
-                    input=True,
-                    frames_per_buffer=self.CHUNK
-                )
-                logging.info(f"成功打开输入流，使用采样率: {self.RATE}Hz")
+                self.input_stream = self.hub.subscribe("barge_in")
+                logging.info(f"已订阅麦克风，采样率: {self.RATE}Hz")
                 return True
             except Exception as e:
                 logging.error(f"设置输入流出错: {e}")
@@ -99,10 +96,9 @@ class SimpleInterruptibleTTS:
         return True  # 如果输入流已经存在
     
     def close_input_stream(self):
-        """关闭音频输入流"""
+        """取消麦克风订阅"""
         if self.input_stream:
             try:
-                self.input_stream.stop_stream()
                 self.input_stream.close()
                 self.input_stream = None
                 logging.info("输入流已关闭")
@@ -119,6 +115,13 @@ class SimpleInterruptibleTTS:
             logging.error(f"语音检测出错: {e}")
             return False
     
+    def speech_flags(self, block, timestamps, gate):
+        """一块连续帧中每帧是否是语音：先做能量预筛选，只有候选帧才调用VAD"""
+        candidates, _ = gate.process_block(block, len(timestamps))
+        frame_bytes = len(block) // len(timestamps)
+        return [bool(c) and self.is_speech(block[i * frame_bytes:(i + 1) * frame_bytes])
+                for i, c in enumerate(candidates)]
+    
     def listen_for_interruption(self):
         """监听用户语音，检测是否需要中断"""
         if not self.setup_input_stream():
@@ -129,22 +132,28 @@ class SimpleInterruptibleTTS:
         required_speech_frames = 3  # 连续检测到3帧语音才触发中断
         
         logging.info("开始监听中断...")
+        self.input_stream.seek_latest()  # 只检测播放开始后的声音
         
-        while self.is_speaking:
+        while self.is_speaking and not self.should_interrupt:
             try:
-                data = self.input_stream.read(self.CHUNK, exception_on_overflow=False)
-                
-                if self.is_speech(data):
-                    consecutive_speech_frames += 1
-                    
-                    # 如果连续检测到语音帧达到阈值，触发中断
-                    if consecutive_speech_frames >= required_speech_frames:
-                        logging.info(f"检测到用户语音，准备中断... (连续帧数: {consecutive_speech_frames})")
-                        self.should_interrupt = True
-                        self.stop_playback()
+                block, timestamps = self.input_stream.read_block(10, timeout=0.5)
+                if block is None:
+                    if self.input_stream.closed:
                         break
-                else:
-                    consecutive_speech_frames = 0  # 重置计数器
+                    continue
+                
+                for speech in self.speech_flags(block, timestamps, self.energy_gate):
+                    if speech:
+                        consecutive_speech_frames += 1
+                        
+                        # 如果连续检测到语音帧达到阈值，触发中断
+                        if consecutive_speech_frames >= required_speech_frames:
+                            logging.info(f"检测到用户语音，准备中断... (连续帧数: {consecutive_speech_frames})")
+                            self.should_interrupt = True
+                            self.stop_playback()
+                            break
+                    else:
+                        consecutive_speech_frames = 0  # 重置计数器
                     
             except Exception as e:
                 logging.error(f"监听中断时出错: {e}")
@@ -176,30 +185,44 @@ class SimpleInterruptibleTTS:
         input_frames = []
         start_time = time.time()
         speech_started = False
-        last_speech_time = time.time()
+        last_speech_time = start_time
         silence_duration = 1.0  # 1秒无语音则结束录音
         max_record_seconds = 7.0  # 最长录音7秒
         
         logging.info("请说话...")
+        self.input_stream.seek_latest()  # 丢弃提示音播放期间录到的声音
         
-        while True:
+        finished = False
+        while not finished:
             try:
-                data = self.input_stream.read(self.CHUNK, exception_on_overflow=False)
+                block, timestamps = self.input_stream.read_block(10, timeout=0.5)
+                if block is None:
+                    if self.input_stream.closed:
+                        break
+                    if (time.time() - start_time) >= max_record_seconds:
+                        logging.info("达到最大录音时间")
+                        break
+                    continue
                 
-                if self.is_speech(data):
-                    if not speech_started:
-                        speech_started = True
-                        logging.info("检测到语音输入...")
-                    last_speech_time = time.time()
-                    input_frames.append(data)
-                else:
-                    if speech_started and (time.time() - last_speech_time) >= silence_duration:
+                frame_bytes = len(block) // len(timestamps)
+                flags = self.speech_flags(block, timestamps, self.input_gate)
+                for i, (speech, timestamp) in enumerate(zip(flags, timestamps)):
+                    if speech:
+                        if not speech_started:
+                            speech_started = True
+                            logging.info("检测到语音输入...")
+                        last_speech_time = timestamp
+                        # 缓冲区槽位会被覆盖，需要复制
+                        input_frames.append(bytes(block[i * frame_bytes:(i + 1) * frame_bytes]))
+                    elif speech_started and (timestamp - last_speech_time) >= silence_duration:
                         logging.info("语音输入结束")
+                        finished = True
                         break
                         
-                if (time.time() - start_time) >= max_record_seconds:
-                    logging.info("达到最大录音时间")
-                    break
+                    if (timestamp - start_time) >= max_record_seconds:
+                        logging.info("达到最大录音时间")
+                        finished = True
+                        break
                     
             except Exception as e:
                 logging.error(f"录音出错: {e}")
@@ -207,9 +230,8 @@ class SimpleInterruptibleTTS:
         
         if input_frames:
             try:
-                audio_data = b"".join(input_frames)
-                logging.info(f"上传 {len(audio_data)} 字节到百度API")
-                result = client.asr(audio_data, 'pcm', self.RATE, {'dev_pid': 1537})
+                logging.info(f"上传 {sum(len(f) for f in input_frames)} 字节到{self.backend.name}")
+                result = await self.requester.transcribe(input_frames, self.RATE)
                 
                 if result['err_no'] == 0 and len(result['result']) > 0:
                     user_question = result['result'][0]
@@ -223,21 +245,11 @@ class SimpleInterruptibleTTS:
             return None
         
     async def prepare_audio_file(self, text):
-        """准备音频文件，返回文件路径"""
+        """准备音频文件，返回文件路径（缓存中的文件，播放后不删除）"""
         try:
-            communicate = edge_tts.Communicate(
-                text=text,
-                voice=self.voice,
-                rate=self.rate,
-                volume=self.volume
-            )
-            
-            temp_file = f"temp_audio_{int(time.time())}_{id(self)}.mp3"
-            
-            await communicate.save(temp_file)
-            logging.info(f"音频文件已保存: {temp_file}")
-            
-            return temp_file
+            audio_file = await self.cache.fetch_path(text, self.voice, self.rate, self.volume)
+            logging.info(f"音频文件已就绪: {audio_file}")
+            return audio_file
         except Exception as e:
             logging.error(f"准备音频文件出错: {e}")
             return None
@@ -303,14 +315,6 @@ class SimpleInterruptibleTTS:
             self.is_speaking = False
             self.should_interrupt = False
             self.playback_process = None
-            
-            # 尝试删除临时文件
-            try:
-                if os.path.exists(audio_file):
-                    os.remove(audio_file)
-                    logging.info(f"临时音频文件已删除: {audio_file}")
-            except Exception as e:
-                logging.error(f"删除临时文件出错: {e}")
     
     async def speak_with_interrupt(self, text):
         """启用中断功能的语音输出主函数"""
@@ -344,17 +348,10 @@ class SimpleInterruptibleTTS:
             return
             
         try:
-            # 创建edge-tts通信实例
-            communicate = edge_tts.Communicate(
-                text=processed_text,
-                voice=self.voice,
-                rate=self.rate,
-                volume=self.volume
-            )
-            
-            # 生成临时文件
-            output_file = f"temp_simple_{int(time.time())}_{id(self)}.mp3"
-            await communicate.save(output_file)
+            # 短句（如"怎么了?"）基本都在缓存里，不用等网络合成
+            output_file = await self.cache.fetch_path(processed_text, self.voice, self.rate, self.volume)
+            if output_file is None:
+                return
             
             # 播放
             subprocess.run(
@@ -362,21 +359,23 @@ class SimpleInterruptibleTTS:
                 stdout=subprocess.DEVNULL, 
                 stderr=subprocess.DEVNULL
             )
-            
-            # 删除临时文件
-            if os.path.exists(output_file):
-                os.remove(output_file)
                 
         except Exception as e:
             logging.error(f"简单语音播放失败: {e}")
     
+    async def warm_up(self, texts):
+        """启动时预合成固定提示语（包括打断后的"怎么了?"）"""
+        texts = [self.preprocess_text(t) for t in [*texts, "怎么了?"]]
+        return await self.cache.warm_up(texts, self.voice, self.rate, self.volume)
+    
     def cleanup(self):
         """清理资源"""
         self.close_input_stream()
         self.stop_playback()
         
-        if self.p:
-            self.p.terminate()
+        if self.hub:
+            self.hub.release()
+            self.hub = None
             logging.info("已清理所有音频资源")
 
 
@@ -7,9 +7,11 @@ import time
 import logging
 import signal
 from face.face_recognize import FaceRecognizer
-from qa_model.qa_model_easy import KnowledgeQA
+from qa_model.qa_model_easy import KnowledgeQA, UNKNOWN_RESPONSES
 from ASR.asr import ASRhelper
+from ASR.keyword_spotter import is_exit_command
 from TTS.tts import TTSHelper
+from TTS.cache import stop_warm_up
 
 # 配置日志 - 美化日志格式
 logging.basicConfig(
@@ -20,9 +22,25 @@ logging.basicConfig(
 
 # 全局退出事件
 shutdown_event = asyncio.Event()
+# 连续几次没听到问题后进入待机，等唤醒词（需要开启本地关键词检测 ASR_KWS=1）
+STANDBY_AFTER = 2
+# 固定的系统提示语，启动时在后台并行预合成，对话中不再等网络
+FIXED_PROMPTS = [
+    "11开始人脸认证，请面向摄像头",
+    "11你是谁呀？我不认识你。系统将退出。",
+    "11正在初始化系统...",
+    "11甘薯知识助手已准备就绪，请问有什么可以帮助你的？",
+    "11我在，请说。",
+    "11抱歉，我没有听清您说的话，请再说一次。",
+    "11我没有听到您的问题，请再说一次。",
+    "11您还有其他问题吗？",
+    "11抱歉，系统遇到了一些问题，请再试一次",
+    "11好的，感谢使用甘薯知识助手，再见！",
+    "11感谢使用甘薯知识助手，再见！",
+] + ["11" + r for r in UNKNOWN_RESPONSES]
 
-async def run_sweet_potato_system(user_name):
-    """运行甘薯知识系统的交互过程"""
+async def run_sweet_potato_system(user_name, qa_init_task=None):
+    """运行甘薯知识系统的交互过程，qa_init_task 为认证期间已开始加载的QA模型任务"""
     print("\n🎉✨ 甘薯知识助手已启动 ✨🎉")
     
     # 先创建必要组件
@@ -53,8 +71,9 @@ async def run_sweet_potato_system(user_name):
         # 初始化QA模型 - 这是最耗时的操作
         print("🧠 正在加载知识模型...")
         
-        # 在单独的任务中初始化QA模型
-        qa_init_task = asyncio.create_task(initialize_qa_model())
+        # 在单独的任务中初始化QA模型（认证期间通常已开始加载）
+        if qa_init_task is None:
+            qa_init_task = asyncio.create_task(initialize_qa_model())
         
         # 等待QA模型初始化完成
         qa = await qa_init_task
@@ -74,21 +93,18 @@ async def run_sweet_potato_system(user_name):
             print("🤖 甘薯知识助手已准备就绪，请问有什么可以帮助你的？")
         
         # 主对话循环
+        missed = 0  # 连续没听到问题的次数，达到 STANDBY_AFTER 后待机等唤醒词
         while not shutdown_event.is_set():
             try:
-                # 清空可能的音频缓冲
-                if hasattr(asr, 'stream') and asr.stream:
-                    try:
-                        # 清空缓冲区中的数据
-                        while hasattr(asr.stream, 'get_read_available') and asr.stream.get_read_available() > 0:
-                            asr.stream.read(asr.CHUNK, exception_on_overflow=False)
-                    except Exception as e:
-                        print(f"⚠️ 清理音频缓冲区时出错: {e}")
+                if missed >= STANDBY_AFTER and asr.spotter is not None:
+                    await asr.wait_for_wake_word()
+                    missed = 0
+                    await tts.text_to_speech("11我在，请说。", wait=True)
 
                 # 步骤 1：语音转文本
                 print("\n📢 等待语音输入...")
-                # 执行语音识别
-                question_data = asr.real_time_recognition()
+                # 执行语音识别（后台线程持续采集，开始聆听时自动丢弃之前的音频）
+                question_data = await asr.recognize_async()
                 
                 # 检查是否收到退出信号
                 if shutdown_event.is_set():
@@ -97,6 +113,7 @@ async def run_sweet_potato_system(user_name):
                 # 检查语音识别结果
                 if 'err_no' in question_data and question_data['err_no'] != 0:
                     print(f"❌ 语音识别失败: {question_data.get('err_msg', '未知错误')}")
+                    missed += 1
                     try:
                         await tts.text_to_speech("11抱歉，我没有听清您说的话，请再说一次。", wait=True)
                     except:
@@ -105,6 +122,7 @@ async def run_sweet_potato_system(user_name):
                     
                 if 'result' not in question_data or not question_data['result']:
                     print("❌ 未检测到语音输入")
+                    missed += 1
                     try:
                         await tts.text_to_speech("11我没有听到您的问题，请再说一次。", wait=True)
                     except:
@@ -112,10 +130,11 @@ async def run_sweet_potato_system(user_name):
                     continue
                     
                 question = question_data['result'][0]
+                missed = 0
                 print(f"🧠 问题：{question}")
                 
                 # 检查是否是退出命令
-                if question.lower() in ["退出。", "没有了。", "没了。", "无。", "关闭。", "停止。", "拜拜。", "再见。","退出了。"]:
+                if is_exit_command(question):
                     print("="*50)
                     print(f"🚪 收到退出命令: '{question}'，lower() 结果是: '{question.lower()}'")
                     print("="*50)
@@ -187,9 +206,9 @@ async def run_sweet_potato_system(user_name):
 
 
 async def initialize_qa_model():
-    """单独的函数用于初始化QA模型"""
+    """单独的函数用于初始化QA模型，在线程中加载以免阻塞事件循环"""
     try:
-        qa = KnowledgeQA()
+        qa = await asyncio.to_thread(KnowledgeQA)
         return qa
     except Exception as e:
         logging.error(f"QA模型初始化失败: {e}")
@@ -214,19 +233,18 @@ async def main():
             signal_handler
         )
     
+    warmup_task = None
     try:
         # 初始化TTS用于欢迎消息
         tts = TTSHelper(voice="zh-CN-XiaoyiNeural", rate="+0%", volume="+0%")
+        # 人脸认证期间在后台预合成固定提示语
+        warmup_task = asyncio.create_task(tts.warm_up(FIXED_PROMPTS))
         
-        # 初始化人脸认证系统
+        # 人脸库由认证子进程自己加载，这里只创建识别器
         face_system = FaceRecognizer()
-        if not face_system.initialize():
-            print("❌ 系统初始化失败，程序退出")
-            try:
-                await tts.text_to_speech("11系统初始化失败，请检查人脸模型", wait=True)
-            except:
-                print("❌ 系统初始化失败，请检查人脸模型")
-            return
+        
+        # 认证期间在后台开始加载QA模型
+        qa_init_task = asyncio.create_task(initialize_qa_model())
         
         # 执行人脸认证
         print("📷 开始人脸认证，请面向摄像头")
@@ -236,8 +254,18 @@ async def main():
             logging.error(f"TTS失败: {e}")
             print("📷 开始人脸认证，请面向摄像头")
         
-        # 执行人脸识别
-        auth_success, user_name = face_system.recognize_face()
+        # 人脸识别在独立进程中进行，不阻塞QA模型加载
+        try:
+            auth_success, user_name = await face_system.recognize_face_async()
+        except RuntimeError as e:
+            logging.error(f"人脸识别系统初始化失败: {e}")
+            print("❌ 系统初始化失败，程序退出")
+            try:
+                await tts.text_to_speech("11系统初始化失败，请检查人脸模型", wait=True)
+            except:
+                print("❌ 系统初始化失败，请检查人脸模型")
+            await asyncio.gather(qa_init_task, return_exceptions=True)
+            return
         
         # 认证通过后运行甘薯知识系统
         if auth_success:
@@ -247,7 +275,7 @@ async def main():
             except:
                 pass
             
-            await run_sweet_potato_system(user_name)
+            await run_sweet_potato_system(user_name, qa_init_task)
 
         else:
             deny_message = "11你是谁呀？我不认识你。系统将退出。"
@@ -256,6 +284,8 @@ async def main():
                 await tts.text_to_speech(deny_message, wait=True)
             except:
                 print("🚫 认证失败，拒绝访问。系统将退出。")
+            # 线程中的QA模型加载无法取消（cancel 只取消等待方），等它结束再退出
+            await asyncio.gather(qa_init_task, return_exceptions=True)
     
     except KeyboardInterrupt:
         print("\n⌨️ 程序被用户中断")
@@ -265,6 +295,7 @@ async def main():
     finally:
         # 确保所有资源都被清理
         print("🔄 程序正在退出...")
+        await stop_warm_up(warmup_task)
 
 
 if __name__ == "__main__":
@@ -5,9 +5,10 @@ import asyncio
 import time
 import logging
 from face.face_recognize import FaceRecognizer
-from qa_model.qa_model_easy import KnowledgeQA
+from qa_model.qa_model_easy import KnowledgeQA, UNKNOWN_RESPONSES
 from ASR.asr import ASRhelper
 from interupt import SimpleInterruptibleTTS  # 使用简化版的 TTS 类
+from TTS.cache import stop_warm_up
 
 # 设置日志
 logging.basicConfig(
@@ -16,6 +17,17 @@ logging.basicConfig(
     handlers=[logging.FileHandler("sweet_potato.log"), logging.StreamHandler()]
 )
 
+# 固定的系统提示语，启动时在后台并行预合成，对话中不再等网络
+FIXED_PROMPTS = [
+    "11系统初始化失败，请检查人脸模型",
+    "11开始人脸认证，请面向摄像头",
+    "11你是谁呀？我不认识你。系统将退出。",
+    "11甘薯知识助手已启动，请问有什么可以帮助你的？",
+    "11抱歉，我没听清楚，请再说一次。",
+    "11抱歉，系统遇到了一些问题，请再试一次",
+    "11感谢使用甘薯知识助手，再见！",
+] + UNKNOWN_RESPONSES
+
 async def run_sweet_potato_system():
     """运行甘薯知识系统的交互过程"""
     # 初始化模块
@@ -35,7 +47,7 @@ async def run_sweet_potato_system():
             print("\n📢 等待语音输入...")
             
             # 执行语音识别
-            question_data = asr.real_time_recognition()
+            question_data = await asr.recognize_async()
             
             # 检查语音识别是否成功
             if question_data['err_no'] != 0:
@@ -67,11 +79,7 @@ async def run_sweet_potato_system():
                 
                 # 输出中断后问题的答案
                 await tts.speak_with_interrupt(interrupt_answer)
-            else:
-                # 增加等待时间，确保语音完全播放完毕
-                wait_time = len(answer) * 0.04 + 3.0  
-                print(f"等待语音播放完成，等待时间: {wait_time:.2f}秒")
-                await asyncio.sleep(wait_time)
+            # speak_with_interrupt 等到 mpg123 进程退出才返回，此时语音已经播完，不需要再按长度等待
 
         except KeyboardInterrupt:
             print("\n🛑 停止交互")
@@ -83,6 +91,8 @@ async def run_sweet_potato_system():
             await asyncio.sleep(4.0)
 
     # 清理资源
+    logging.info(f"麦克风采集统计: {asr.hub.stats()}")
+    logging.info(f"TTS缓存统计: {tts.cache.summary()}")
     if hasattr(asr, 'stop_recording'):
         asr.stop_recording()
     if hasattr(tts, 'cleanup'):
@@ -98,6 +108,8 @@ async def main():
     
     # 初始化TTS用于欢迎消息
     tts = SimpleInterruptibleTTS(voice="zh-CN-XiaoyiNeural", rate="+0%", volume="+0%")
+    # 人脸认证期间在后台预合成固定提示语
+    warmup_task = asyncio.create_task(tts.warm_up(FIXED_PROMPTS))
     
     try:
         # 初始化人脸认证系统
@@ -130,6 +142,7 @@ async def main():
             await asyncio.sleep(5.0)
     finally:
         # 确保资源被正确清理
+        await stop_warm_up(warmup_task)
         if hasattr(tts, 'cleanup'):
             tts.cleanup()
 
@@ -8,9 +8,11 @@ import argparse
 import time
 import itertools
 import threading
-from qa_model.qa_model_easy import KnowledgeQA
+from qa_model.qa_model_easy import KnowledgeQA, UNKNOWN_RESPONSES
 from ASR.asr import ASRhelper
+from ASR.keyword_spotter import is_exit_command
 from TTS.tts_stream import TTSStreamer  
+from TTS.cache import stop_warm_up
 from face.face_recognize import FaceRecognizer
 import random
 # 配置日志 - 美化日志格式
@@ -68,6 +70,8 @@ class SweetPotatoChatbox:
         self.face_auth_success = False
         self.recognized_user = None
         self.first_interaction = True  # 标记是否是第一次交互
+        self.missed = 0  # 连续没听到问题的次数，达到 standby_after 后待机等唤醒词（需要 ASR_KWS=1）
+        self.standby_after = 2
         self.follow_up_prompts = [
     "您还有什么问题吗？",
     "您还有什么想问的？",
@@ -78,6 +82,17 @@ class SweetPotatoChatbox:
     "嘿嘿嘿你说呀？",
     "太豆了你，赶紧说？"
 ]
+        # 固定的系统提示语，初始化时在后台并行预合成，对话中不再等网络
+        self.fixed_prompts = [
+            "11请问您有什么关于甘薯的问题？",
+            "11我没有听到您的问题，请再说一次。",
+            "11好的，感谢使用甘薯知识助手，再见！",
+            "11感谢使用甘薯知识助手再见！",
+            # 认证阶段临时TTS说的提示语（共用同一个缓存）
+            "11你是谁我不认识你系统将退出。",
+            "11人脸识别系统初始化失败,请检查人脸模型",
+        ] + ["11" + p for p in self.follow_up_prompts] + UNKNOWN_RESPONSES
+        self.warmup_task = None
         
     async def authenticate_user(self):
         """使用人脸识别进行用户认证"""
@@ -86,23 +101,20 @@ class SweetPotatoChatbox:
         
         # 初始化TTS用于提示信息
         temp_tts = TTSStreamer(voice=self.voice)
+        # wait=True 按音频时长等到提示语真正播完，再打开摄像头
         await temp_tts.speak_text("11开始人脸认证，请面向摄像头", wait=True)
         
-        # 等待确保语音播放完毕后再进行识别
-        await asyncio.sleep(1.0)
-        
-        # 初始化人脸识别系统
+        # 执行人脸认证（在独立进程中加载人脸库并识别，不阻塞事件循环上的模型加载）
         face_system = FaceRecognizer()
-        if not face_system.initialize():
-            logging.error("❌ 人脸识别系统初始化失败")
+        try:
+            auth_success, user_name = await face_system.recognize_face_async()
+        except RuntimeError as e:
+            logging.error(f"❌ 人脸识别系统初始化失败: {e}")
             await temp_tts.speak_text("11人脸识别系统初始化失败,请检查人脸模型", wait=True)
             await temp_tts.shutdown()
             print("❌ 人脸识别系统初始化失败，程序退出")
             return False, None
         
-        # 执行人脸认证
-        auth_success, user_name = face_system.recognize_face()
-        
         # 根据认证结果提供语音反馈
         if auth_success:
             welcome_message = f"11欢迎你{user_name}已进入甘薯知识系统。"
@@ -121,53 +133,23 @@ class SweetPotatoChatbox:
         return auth_success, user_name
         
     async def initialize(self):
-        """初始化所有组件"""
+        """初始化所有组件（与人脸认证并行进行，不播放语音提示）"""
         try:
             logging.info("🚀 正在初始化甘薯问答系统...")
             print("\n🚀 正在初始化甘薯问答系统...")
             
             # 先初始化TTS
-            tts_loader = LoadingAnimation("初始化语音合成系统")
-            tts_loader.start()
             self.tts = TTSStreamer(voice=self.voice)
-            tts_loader.stop()
-            
-            try:
-                await self.tts.speak_text("11正在初始化系统...", wait=True)
-            except Exception as e:
-                logging.error(f"⚠️ TTS初始化测试失败: {e}")
-                print("⚠️ 警告: 语音合成服务不可用，将以文本方式提供反馈")
-            
-            # 等待确保语音播放完毕
-            await asyncio.sleep(0.5)
+            # 与人脸认证、模型加载并行预合成固定提示语
+            self.warmup_task = asyncio.create_task(self.tts.warm_up(self.fixed_prompts))
                 
-            # 初始化ASR
+            # 初始化ASR（在线程中执行，避免阻塞事件循环）
             logging.info("🎤 初始化语音识别...")
-            asr_loader = LoadingAnimation("初始化语音识别系统")
-            asr_loader.start()
-            self.asr = ASRhelper()
-            asr_loader.stop()
+            self.asr = await asyncio.to_thread(ASRhelper)
             
-            # 初始化QA模型
+            # 初始化QA模型 - 这是最耗时的操作
             logging.info("🧠 正在加载知识模型，这可能需要一些时间...")
-            try:
-                await self.tts.speak_text("11正在加载知识模型，这可能需要一些时间...", wait=True)
-            except Exception as e:
-                logging.error(f"⚠️ TTS语音播放失败: {e}")
-                print("🧠 正在加载知识模型，这可能需要一些时间...")
-            
-            # 等待确保语音播放完毕
-            await asyncio.sleep(0.5)
-            
-            # 显示加载动画
-            qa_loader = LoadingAnimation(f"加载知识模型 {self.model}")
-            qa_loader.start()
-                
-            # 初始化QA模型
-            self.qa = KnowledgeQA(llm_model=self.model)
-            
-            # 停止加载动画
-            qa_loader.stop()
+            self.qa = await asyncio.to_thread(KnowledgeQA, llm_model=self.model)
             
             logging.info("✨ 系统初始化完成")
             print("\n✨ 系统初始化完成，甘薯知识助手已准备就绪")
@@ -191,33 +173,32 @@ class SweetPotatoChatbox:
         logging.info("🛑 收到系统退出信号，正在安全退出...")
         print(f"\n{'🛑 收到系统退出信号，正在安全退出... 🛑':^80}")
         self.shutdown_event.set()
+        # 立即停止正在说的话，等待播放完成的地方随之返回
+        if self.tts:
+            self.tts.cancel()
     
     async def clear_audio_buffer(self):
-        """清理音频缓冲区 - 更快速的清理"""
-        try:
-            if hasattr(self.asr, 'stream'):
-                # 减少清理次数，加快处理速度
-                time.sleep(0.1)  # 从0.2减少到0.1
-                while self.asr.stream.get_read_available() > 0:
-                    self.asr.stream.read(self.asr.CHUNK, exception_on_overflow=False)
-                    
-                logging.info("🧹 音频缓冲区已清理")
-        except Exception as e:
-            logging.warning(f"⚠️ 清理音频缓冲区时出错: {e}")
+        """丢弃尚未取走的语音（采集线程持续运行，无需轮询读取设备）"""
+        if self.asr:
+            self.asr.flush()
+            logging.info("🧹 音频缓冲区已清理")
     
     async def process_user_input(self):
         """处理用户语音输入 - 优化时序，提高响应速度"""
         logging.info("\n🎤 等待语音播放完🎤")
         
-        # 确保TTS完全结束
+        # 等TTS真正播完（按音频时长跟踪），随即开始聆听
         await self.tts.wait_until_done()
         
-        # 减少等待时间，仅保留必要的缓冲
-        await asyncio.sleep(0.5)  
-        
         # 清空音频缓冲区
         await self.clear_audio_buffer()
         
+        # 长时间没人说话时待机，听到唤醒词再继续，待机期间不上传任何音频
+        if self.missed >= self.standby_after and self.asr.spotter is not None:
+            await self.asr.wait_for_wake_word()
+            self.missed = 0
+            self.first_interaction = True
+        
         # 提示文本
         prompt_text = "11请问您有什么关于甘薯的问题？" if self.first_interaction else "11"+random.choice(self.follow_up_prompts)
         self.first_interaction = False
@@ -228,9 +209,6 @@ class SweetPotatoChatbox:
             logging.error(f"⚠️ 语音提示失败: {e}")
             print(prompt_text.replace("11", ""))
         
-        # 减少提示后的等待时间
-        await asyncio.sleep(0.3)  # 从1.5减少到0.3秒
-        
         # 清空音频缓冲
         await self.clear_audio_buffer()
         
@@ -238,8 +216,9 @@ class SweetPotatoChatbox:
         listening_spinner = LoadingAnimation("正在聆听")
         listening_spinner.start()
         
-        # 执行语音识别
-        question_result = self.asr.real_time_recognition()
+        # 执行语音识别（开启流式识别时边说边识别）
+        question_result = await self.asr.recognize_streaming(
+            on_partial=lambda text, stable: logging.info(f"🗣️ 中间结果: {text}"))
         
         # 停止监听指示器
         listening_spinner.stop()
@@ -248,20 +227,21 @@ class SweetPotatoChatbox:
         if not question_result or 'result' not in question_result or not question_result['result']:
             logging.info("❌ 未检测到有效语音输入")
             print("❌ 未检测到有效语音输入")
+            self.missed += 1
             try:
                 await self.tts.speak_text("11我没有听到您的问题，请再说一次。", wait=True)
-                await asyncio.sleep(0.3)  # 减少等待时间
                 await self.clear_audio_buffer()
             except:
                 print("🔄 我没有听到您的问题，请再说一次。")
             return None
             
         question = question_result["result"][0]
+        self.missed = 0
         logging.info(f"💬 问题: {question}")
         print(f"💬 问题: {question}")
         
         # 检查是否是退出命令
-        if question.lower() in ["退出", "退出。", "没有了", "没有了。", "没了", "没了。", "无", "无。", "关闭", "关闭。", "停止", "停止。", "拜拜", "拜拜。", "再见", "再见。","退出了。"]:
+        if is_exit_command(question):
             logging.info("="*50)
             logging.info(f"🚪 收到退出命令: '{question}'，lower() 结果是: '{question.lower()}'")
             logging.info("="*50)
@@ -283,15 +263,29 @@ class SweetPotatoChatbox:
     
     async def run(self):
         """运行主循环"""
-        # 首先进行人脸认证
+        # 人脸认证与系统组件初始化同时进行
+        init_task = asyncio.create_task(self.initialize())
         self.face_auth_success, self.recognized_user = await self.authenticate_user()
         
         # 如果人脸认证失败，退出程序
         if not self.face_auth_success:
+            # to_thread 中的模型加载无法取消，等它结束后统一释放资源（ASR已订阅麦克风）
+            await asyncio.gather(init_task, return_exceptions=True)
+            self.shutdown_event.set()
+            await self.shutdown()
             return
             
-        # 人脸认证成功后，初始化系统组件
-        if not await self.initialize():
+        # 等待仍未完成的初始化
+        if not init_task.done():
+            loader = LoadingAnimation("等待知识模型加载")
+            loader.start()
+            try:
+                initialized = await init_task
+            finally:
+                loader.stop()
+        else:
+            initialized = init_task.result()
+        if not initialized:
             return
             
         self.setup_signal_handlers()
@@ -307,8 +301,6 @@ class SweetPotatoChatbox:
             # 初始欢迎语
             try:
                 await self.tts.speak_text(f"11{self.recognized_user}，甘薯知识问答系统已启动。", wait=True)
-                # 确保欢迎语播放完毕后再继续
-                await asyncio.sleep(0.5)
                 await self.clear_audio_buffer()
             except Exception as e:
                 logging.error(f"⚠️ 播放欢迎消息失败: {e}")
@@ -379,9 +371,13 @@ class SweetPotatoChatbox:
                 except Exception as e:
                     logging.error(f"⚠️ 播放告别语音失败: {e}")
             
+            # 预合成还在进行时取消
+            await stop_warm_up(self.warmup_task)
+            
             # 先关闭TTS (最重要的资源释放)
             if self.tts:
                 await self.tts.shutdown()
+                logging.info(f"TTS缓存统计: {self.tts.cache.summary()}")
                 
             # 关闭ASR
             if self.asr:
@@ -19,6 +19,18 @@ logging.basicConfig(
     handlers=[logging.FileHandler("chat.log"), logging.StreamHandler()]
 )
 
+# 知识库里没有答案时让模型说的话（固定文本，TTS启动时会预合成）
+UNKNOWN_RESPONSES = [
+    "我不知道",
+    "这个问题我无法回答",
+    "抱歉我不太会",
+    "我还不了解这方面。",
+    "对不起，我没有这方面的资料。",
+    "我不知道这个答案，不过你可以去问吴家卓",
+    "好像不太会？",
+    "我里个豆阿，你问出这么难的问题我怎么会呢？"
+]
+
 
 class KnowledgeQA:
     def __init__(
@@ -40,16 +52,7 @@ class KnowledgeQA:
         self.vectorstore = self._load_vectorstore_with_retry()
         self.llm = self._init_llm()
         self.qa_chain = self._init_qa_chain()
-        self.unknown_responses  = [
-    "我不知道",
-    "这个问题我无法回答",
-    "抱歉我不太会",
-    "我还不了解这方面。",
-    "对不起，我没有这方面的资料。",
-    "我不知道这个答案，不过你可以去问吴家卓",
-    "好像不太会？",
-    "我里个豆阿，你问出这么难的问题我怎么会呢？"
-]
+        self.unknown_responses = list(UNKNOWN_RESPONSES)
     
     def _init_embeddings(self):
         """初始化向量模型"""
@@ -0,0 +1,64 @@
+import threading
+
+from ASR.audio_buffer import AudioRingBuffer
+
+
+def fill(ring, count, start=0):
+    for i in range(start, start + count):
+        ring.write(bytes([i % 256]) * ring.frame_bytes, float(i))
+
+
+def test_read_returns_frames_in_order():
+    ring = AudioRingBuffer(capacity=4, frame_bytes=2)
+    fill(ring, 3)
+    seq = 0
+    for i in range(3):
+        seq, frame, timestamp = ring.read(seq)
+        assert bytes(frame) == bytes([i, i])
+        assert timestamp == float(i)
+    assert seq == 3
+    assert ring.overruns == 0
+
+
+def test_lagging_reader_skips_to_oldest_frame_and_counts_overrun():
+    ring = AudioRingBuffer(capacity=4, frame_bytes=2)
+    fill(ring, 10)  # 帧0~5已被覆盖
+    seq, frame, timestamp = ring.read(0)
+    assert ring.overruns == 6
+    assert bytes(frame) == bytes([6, 6]) and timestamp == 6.0
+    assert seq == 7
+
+
+def test_read_block_stops_at_end_of_buffer():
+    ring = AudioRingBuffer(capacity=4, frame_bytes=2)
+    fill(ring, 6)  # 槽位: [4, 5, 2, 3]
+    seq, block, timestamps = ring.read_block(2, max_frames=10)
+    assert seq == 4 and bytes(block) == bytes([2, 2, 3, 3]) and timestamps == [2.0, 3.0]
+    seq, block, timestamps = ring.read_block(seq, max_frames=10)
+    assert seq == 6 and bytes(block) == bytes([4, 4, 5, 5]) and timestamps == [4.0, 5.0]
+
+
+def test_read_times_out_when_no_new_frame():
+    ring = AudioRingBuffer(capacity=4, frame_bytes=2)
+    fill(ring, 1)
+    assert ring.read(1, timeout=0.01) == (1, None, None)
+
+
+def test_close_wakes_waiting_reader():
+    ring = AudioRingBuffer(capacity=4, frame_bytes=2)
+    result = []
+    reader = threading.Thread(target=lambda: result.append(ring.read(ring.latest_seq())))
+    reader.start()
+    ring.close()
+    reader.join(timeout=1.0)
+    assert not reader.is_alive()
+    assert result == [(0, None, None)]
+
+
+def test_readers_are_independent():
+    ring = AudioRingBuffer(capacity=8, frame_bytes=1)
+    fill(ring, 5)
+    for _ in range(3):
+        seq, block, _ = ring.read_block(0, max_frames=8)
+        assert seq == 5 and bytes(block) == bytes(range(5))
+    assert ring.overruns == 0
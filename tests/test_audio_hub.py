@@ -0,0 +1,50 @@
+import pytest
+
+pyaudio = pytest.importorskip("pyaudio")
+
+from ASR.audio_hub import MicrophoneHub
+
+
+def frame(hub, value):
+    return bytes([value]) * hub.frame_bytes
+
+
+def test_every_subscriber_sees_every_frame():
+    hub = MicrophoneHub(ring_seconds=1)
+    hub.running = True
+    asr, barge_in = hub.subscribe("asr"), hub.subscribe("barge_in")
+    for value in range(5):
+        hub._on_audio(frame(hub, value), hub.CHUNK, {}, 0)
+
+    for sub in (asr, barge_in):
+        block, timestamps = sub.read_block(10, timeout=0)
+        assert len(timestamps) == 5
+        assert bytes(block) == b"".join(frame(hub, v) for v in range(5))
+    assert hub.stats()["subscribers"]["barge_in"] == {"frames_read": 5, "dropped_frames": 0}
+
+
+def test_device_overflow_is_counted_without_dropping_the_frame():
+    hub = MicrophoneHub(ring_seconds=1)
+    hub.running = True
+    sub = hub.subscribe("asr")
+    hub._on_audio(frame(hub, 1), hub.CHUNK, {}, 0)
+    hub._on_audio(frame(hub, 2), hub.CHUNK, {}, pyaudio.paInputOverflow)
+
+    assert hub.device_overruns == 1
+    assert hub.captured_frames == 2
+    assert bytes(sub.read(timeout=0)[0]) == frame(hub, 1)
+    assert bytes(sub.read(timeout=0)[0]) == frame(hub, 2)
+
+
+def test_slow_subscriber_counts_overwritten_frames():
+    hub = MicrophoneHub(ring_seconds=1)  # 50 帧
+    hub.running = True
+    slow, fast = hub.subscribe("slow"), hub.subscribe("fast")
+    for value in range(60):
+        hub._on_audio(frame(hub, value), hub.CHUNK, {}, 0)
+        fast.read(timeout=0)
+
+    data, _ = slow.read(timeout=0)
+    assert bytes(data) == frame(hub, 10)
+    assert slow.dropped_frames == 10
+    assert fast.dropped_frames == 0
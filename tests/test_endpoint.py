@@ -0,0 +1,79 @@
+import numpy as np
+
+from ASR.endpoint import Endpointer
+
+FRAME_SECONDS = 0.02
+SAMPLES = 320  # 16kHz下20ms
+
+
+class LoudnessVAD:
+    """以幅度判断是否为语音"""
+
+    def is_speech(self, frame, rate):
+        return abs(int(np.frombuffer(frame, dtype=np.int16)[0])) > 100
+
+
+def pcm(amplitude):
+    return np.full(SAMPLES, amplitude, dtype=np.int16).tobytes()
+
+
+class Feeder:
+    """按 [(幅度, 秒数)] 逐帧输入端点检测器，记录得到的 Utterance"""
+
+    def __init__(self, endpointer):
+        self.endpointer = endpointer
+        self.time = 0.0
+        self.utterances = []
+
+    def feed(self, *pattern):
+        for amplitude, seconds in pattern:
+            for _ in range(int(round(seconds / FRAME_SECONDS))):
+                utterance = self.endpointer.process(pcm(amplitude), self.time)
+                if utterance is not None:
+                    self.utterances.append(utterance)
+                self.time += FRAME_SECONDS
+        return self
+
+
+def test_preroll_keeps_audio_before_speech_onset():
+    events = []
+    endpointer = Endpointer(LoudnessVAD(), preroll_duration=0.1, tail_duration=0.0,
+                            on_event=lambda kind, t: events.append(kind))
+    feeder = Feeder(endpointer).feed((5, 1.0), (1000, 0.4), (5, 1.0))
+
+    [utterance] = feeder.utterances
+    assert utterance.reason == "silence"
+    assert abs(utterance.start_time - 1.0) < 1e-9  # 开始时间是第一帧语音，而不是确认开始说话的那一帧
+    # 预录音0.1秒（5帧）：确认开始说话时已收到的3帧语音和之前2帧静音都保留在最前面，不会吞掉第一个字
+    assert utterance.frames[:3] == [pcm(5), pcm(5), pcm(1000)]
+    assert utterance.frames.count(pcm(1000)) == 20
+    assert events == ["speech_start", "endpoint"]
+
+
+def test_silence_threshold_follows_speaker_pauses():
+    slow = Endpointer(LoudnessVAD(), min_silence=0.2, max_silence=1.0)
+    fast = Endpointer(LoudnessVAD(), min_silence=0.2, max_silence=1.0)
+    assert slow.silence_threshold() == fast.silence_threshold() == slow.silence_duration
+
+    Feeder(slow).feed((5, 0.2), *[(1000, 0.3), (5, 0.4)] * 3, (1000, 0.3))
+    Feeder(fast).feed((5, 0.2), *[(1000, 0.3), (5, 0.1)] * 3, (1000, 0.3))
+    assert slow.pause_ema > fast.pause_ema
+    assert slow.silence_threshold() > 0.5 > fast.silence_threshold()
+
+
+def test_adapted_threshold_shortens_endpoint_latency():
+    endpointer = Endpointer(LoudnessVAD(), silence_duration=0.8, min_silence=0.2)
+    feeder = Feeder(endpointer).feed((5, 0.2), (1000, 0.3), (5, 1.0))
+    first = feeder.utterances[-1].endpoint_latency
+
+    # 说话人句中停顿很短：阈值随之缩短，下一句更快判定结束
+    feeder.feed(*[(1000, 0.3), (5, 0.1)] * 3, (1000, 0.3), (5, 1.0))
+    second = feeder.utterances[-1].endpoint_latency
+    assert len(feeder.utterances) == 2
+    assert second < first
+
+
+def test_noisy_environment_extends_threshold():
+    endpointer = Endpointer(LoudnessVAD(), silence_duration=0.5, noise_extra=0.2)
+    Feeder(endpointer).feed((90, 1.0), (200, 0.3))  # 语音能量不到噪声的3倍
+    assert abs(endpointer.silence_threshold() - 0.7) < 1e-9
@@ -0,0 +1,74 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+
+from face import face_create
+from face.face_create import EncodingCache, train_face_model
+from face.face_db import load_face_db
+
+
+def test_encoding_cache_round_trip(tmp_path):
+    path = str(tmp_path / "cache.npz")
+    cache = EncodingCache(path)
+    cache.put("with_face", np.arange(128, dtype=np.float64))
+    cache.put("no_face", None)
+    cache.put("stale", np.zeros(128))
+    cache.save(keep_keys={"with_face", "no_face"})
+
+    loaded = EncodingCache(path)
+    assert set(loaded.entries) == {"with_face", "no_face"}
+    np.testing.assert_array_equal(loaded.get("with_face"), np.arange(128))
+    assert "no_face" in loaded and loaded.get("no_face") is None
+
+
+@pytest.fixture
+def enrollment(tmp_path, monkeypatch):
+    """图片内容即特征：第一个字节为0的图片视为没有人脸；记录每次真正提取特征的图片"""
+    encoded = []
+
+    def fake_encode(image_path):
+        encoded.append(image_path)
+        data = open(image_path, "rb").read()
+        return None if data[0] == 0 else np.full(128, data[0], dtype=np.float64)
+
+    monkeypatch.setattr(face_create, "encode_image", fake_encode)
+    monkeypatch.setattr(face_create, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    def write_image(name, value):
+        path = tmp_path / f"{name}.jpg"
+        path.write_bytes(bytes([value]) * 16)
+        return str(path)
+
+    def enroll(manifest):
+        manifest_path = tmp_path / "faces.json"
+        manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+        encoded.clear()
+        train_face_model(str(manifest_path), output_path=str(tmp_path / "db.npy"),
+                         cache_path=str(tmp_path / "cache.npz"), workers=2)
+        return list(encoded)
+
+    return write_image, enroll, str(tmp_path / "db.npy"), str(tmp_path / "cache.npz")
+
+
+def test_only_new_images_are_encoded(enrollment):
+    write_image, enroll, db_path, cache_path = enrollment
+    alice = [write_image("alice1", 1), write_image("alice2", 3)]
+    bob = write_image("bob", 5)
+    blank = write_image("blank", 0)
+
+    assert len(enroll({"alice": alice, "bob": bob, "nobody": blank})) == 4
+    names, encodings, _ = load_face_db(db_path)
+    assert names == ["alice", "bob"]  # 没有人脸的图片不进入人脸库
+    np.testing.assert_allclose(encodings[0], 2.0)  # 多张图片取平均
+
+    # 再次录入：全部命中缓存
+    assert enroll({"alice": alice, "bob": bob, "nobody": blank}) == []
+
+    # 新增一张图片，只提取这一张；不再使用的图片从缓存中清除
+    carol = write_image("carol", 7)
+    assert enroll({"alice": alice, "carol": carol}) == [carol]
+    assert len(EncodingCache(cache_path).entries) == 3
+    assert load_face_db(db_path)[0] == ["alice", "carol"]
@@ -0,0 +1,57 @@
+import json
+import pickle
+import numpy as np
+import pytest
+
+from face.face_db import save_face_db, load_face_db, convert_pickle, sidecar_path
+
+
+def test_round_trip_keeps_names_encodings_and_metadata(tmp_path):
+    db_path = str(tmp_path / "faces.npy")
+    encodings = np.random.default_rng(0).normal(size=(3, 128))
+    save_face_db(db_path, ["张三", "李四", "alice"], encodings, metadata={"source": "test"})
+
+    names, loaded, metadata = load_face_db(db_path)
+    assert names == ["张三", "李四", "alice"]
+    assert isinstance(loaded, np.memmap)
+    assert loaded.dtype == np.float32
+    np.testing.assert_allclose(loaded, encodings.astype(np.float32))
+    assert metadata == {"source": "test"}
+
+    names, in_memory, _ = load_face_db(db_path, mmap=False)
+    assert not isinstance(in_memory, np.memmap)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_empty_database_round_trips(tmp_path):
+    db_path = str(tmp_path / "empty.npy")
+    save_face_db(db_path, [], [])
+    names, encodings, _ = load_face_db(db_path)
+    assert names == []
+    assert encodings.shape == (0, 128)
+
+
+def test_mismatched_sidecar_is_reported(tmp_path):
+    db_path = str(tmp_path / "faces.npy")
+    save_face_db(db_path, ["a", "b"], np.zeros((2, 128)))
+    with open(sidecar_path(db_path), encoding="utf-8") as f:
+        sidecar = json.load(f)
+    sidecar["names"].append("c")
+    with open(sidecar_path(db_path), "w", encoding="utf-8") as f:
+        json.dump(sidecar, f)
+
+    with pytest.raises(ValueError):
+        load_face_db(db_path)
+
+
+def test_convert_pickle(tmp_path):
+    pickle_path = tmp_path / "old.pkl"
+    known = {"alice": np.ones(128), "bob": np.zeros(128)}
+    pickle_path.write_bytes(pickle.dumps(known))
+    db_path = str(tmp_path / "new.npy")
+
+    convert_pickle(str(pickle_path), db_path)
+    names, encodings, metadata = load_face_db(db_path)
+    assert names == ["alice", "bob"]
+    np.testing.assert_array_equal(encodings[0], np.ones(128))
+    assert metadata["converted_from"] == "old.pkl"
@@ -0,0 +1,55 @@
+from face.face_evidence import EvidenceAccumulator
+
+
+def feed(evidence, name, distance, max_frames=50):
+    """重复同一个样本直到做出判定，返回 (判定, 名字, 用了几帧)"""
+    for _ in range(max_frames):
+        evidence.update(name, distance)
+        decision, who = evidence.decision()
+        if decision is not None:
+            return decision, who, evidence.frames
+    return None, None, evidence.frames
+
+
+def test_strong_match_accepts_in_one_frame():
+    evidence = EvidenceAccumulator()
+    evidence.update("alice", 0.2)
+    assert evidence.decision() == ("accept", "alice")
+    assert evidence.frames == 1
+
+
+def test_good_match_accepts_within_a_few_frames():
+    assert feed(EvidenceAccumulator(), "alice", 0.35)[:2] == ("accept", "alice")
+    assert feed(EvidenceAccumulator(), "alice", 0.35)[2] <= 4
+
+
+def test_distance_within_tolerance_eventually_accepts():
+    # 阈值内的样本（compare_faces 认为匹配）不会因为接近阈值而被拒绝
+    for distance in (0.37, 0.39, 0.4):
+        decision, who, frames = feed(EvidenceAccumulator(), "alice", distance)
+        assert (decision, who) == ("accept", "alice"), distance
+        assert frames < 15
+
+
+def test_borderline_distance_above_tolerance_is_rejected_instead_of_timing_out():
+    # 略大于阈值的样本以前既不接受也不拒绝，一直等到超时
+    for distance in (0.41, 0.42, 0.45):
+        decision, who, frames = feed(EvidenceAccumulator(), "alice", distance)
+        assert decision == "reject", distance
+        assert who is None
+        assert frames < 15
+
+
+def test_unknown_face_is_rejected():
+    decision, _, frames = feed(EvidenceAccumulator(), "alice", 0.6)
+    assert decision == "reject"
+    assert frames <= 4
+
+
+def test_single_outlier_does_not_reject_a_good_match():
+    evidence = EvidenceAccumulator()
+    evidence.update("alice", 0.7)
+    assert evidence.decision() == (None, None)
+    evidence.update("alice", 0.25)
+    evidence.update("alice", 0.25)
+    assert evidence.decision() == ("accept", "alice")
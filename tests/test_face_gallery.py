@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from face.face_gallery import FaceGallery
+
+
+@pytest.fixture
+def gallery():
+    rng = np.random.default_rng(0)
+    encodings = rng.normal(size=(200, 128)).astype(np.float32)
+    names = [f"person_{i}" for i in range(len(encodings))]
+    return FaceGallery(names, encodings)
+
+
+def brute_force(gallery, queries):
+    return np.linalg.norm(queries[:, None, :] - gallery.encodings[None, :, :], axis=2)
+
+
+def test_top_k_matches_brute_force(gallery):
+    queries = np.random.default_rng(1).normal(size=(7, 128)).astype(np.float32)
+    idx, dists = gallery.query(queries, k=5)
+
+    expected = brute_force(gallery, queries)
+    assert idx.shape == dists.shape == (7, 5)
+    np.testing.assert_array_equal(idx, np.argsort(expected, axis=1)[:, :5])
+    np.testing.assert_allclose(dists, np.sort(expected, axis=1)[:, :5], rtol=1e-4)
+    assert np.all(np.diff(dists, axis=1) >= 0)
+
+
+def test_k_larger_than_gallery_returns_everything_sorted():
+    gallery = FaceGallery(["a", "b", "c"], np.eye(3, 128, dtype=np.float32))
+    query = np.zeros(128, dtype=np.float32)
+    query[1] = 0.9
+    idx, dists = gallery.query(query, k=10)
+    assert idx[0, 0] == 1 and sorted(idx[0, 1:]) == [0, 2]
+    np.testing.assert_allclose(dists[0], [0.1, np.sqrt(1 + 0.81), np.sqrt(1 + 0.81)], rtol=1e-5)
+
+
+def test_match_applies_tolerance(gallery):
+    near = gallery.encodings[42] + 0.01
+    far = gallery.encodings[42] + 1.0
+    (name, distance), (missing, far_distance) = gallery.match([near, far], tolerance=0.4)
+    assert name == "person_42"
+    assert distance < 0.4
+    assert missing is None
+    assert far_distance > 0.4
+
+
+def test_empty_gallery_matches_nothing():
+    gallery = FaceGallery([], [])
+    assert len(gallery) == 0
+    assert gallery.match([np.zeros(128)]) == [(None, float("inf"))]
+
+
+def test_mismatched_names_and_encodings_are_rejected():
+    with pytest.raises(ValueError):
+        FaceGallery(["a", "b"], np.zeros((3, 128)))
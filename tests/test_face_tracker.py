@@ -0,0 +1,41 @@
+from face.face_tracker import FaceTracker, box_iou
+
+
+def test_undecided_stationary_track_is_not_reencoded_every_detection():
+    tracker = FaceTracker(reencode_every=3)
+    box = (100, 200, 200, 100)
+    encoded = []
+    for detection in range(1, 8):
+        track, = tracker.update([box], detection * 2)
+        if tracker.needs_encoding(track, detection, settled=False):
+            tracker.set_encoding(track, [0.0], detection)
+            encoded.append(detection)
+    assert encoded == [1, 4, 7]
+
+
+def test_undecided_track_is_reencoded_when_it_moves():
+    tracker = FaceTracker(reencode_every=3)
+    track, = tracker.update([(100, 200, 200, 100)], 0)
+    tracker.set_encoding(track, [0.0], 1)
+    track, = tracker.update([(102, 202, 202, 102)], 2)
+    assert not tracker.needs_encoding(track, 2)
+    track, = tracker.update([(130, 230, 230, 130)], 4)
+    assert tracker.needs_encoding(track, 3)
+
+
+def test_settled_track_is_reencoded_only_when_it_moves():
+    tracker = FaceTracker(reencode_every=3)
+    track, = tracker.update([(100, 200, 200, 100)], 0)
+    tracker.set_encoding(track, [0.0], 1)
+    track, = tracker.update([(102, 202, 202, 102)], 20)
+    assert not tracker.needs_encoding(track, 10, settled=True)
+    track, = tracker.update([(140, 240, 240, 140)], 22)
+    assert tracker.needs_encoding(track, 11, settled=True)
+
+
+def test_nearby_boxes_keep_their_track():
+    tracker = FaceTracker()
+    first, second = tracker.update([(100, 200, 200, 100), (100, 500, 200, 400)], 0)
+    moved_second, moved_first = tracker.update([(105, 505, 205, 405), (104, 204, 204, 104)], 1)
+    assert moved_first is first and moved_second is second
+    assert box_iou(first.box, (104, 204, 204, 104)) == 1.0
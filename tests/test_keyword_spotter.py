@@ -0,0 +1,116 @@
+import json
+import time
+import asyncio
+import pytest
+
+pytest.importorskip("pyaudio")
+pytest.importorskip("webrtcvad")
+
+from ASR import keyword_spotter
+from ASR.asr import ASRhelper
+from ASR.endpoint import Utterance
+from ASR.backends import StandInBackend
+from ASR.resilient import ResilientASR
+from ASR.keyword_spotter import KeywordSpotter
+
+FRAMES = [b"\x00\x01" * 320] * 20
+
+
+class ScriptedRecognizer:
+    """返回预设最终结果的识别器，记录收到的语法"""
+
+    grammars = []
+
+    def __init__(self, model, rate, grammar):
+        self.grammars.append(json.loads(grammar))
+
+    def SetWords(self, enabled):
+        pass
+
+    def AcceptWaveform(self, data):
+        return False
+
+    def FinalResult(self):
+        return ScriptedRecognizer.result
+
+
+class FakeVosk:
+    KaldiRecognizer = ScriptedRecognizer
+
+
+class FakeHub:
+    RATE = 16000
+    CHUNK = 320
+
+
+def vosk_result(text, conf=0.95):
+    words = [{"word": w, "conf": conf} for w in text.split()]
+    return json.dumps({"text": text, "result": words}, ensure_ascii=False)
+
+
+@pytest.fixture
+def spotter(monkeypatch):
+    monkeypatch.setattr(keyword_spotter, "vosk", FakeVosk)
+    return KeywordSpotter(hub=FakeHub(), model=object())
+
+
+def test_grammar_has_unknown_word(spotter):
+    ScriptedRecognizer.result = vosk_result("退出")
+    assert spotter.match_command(FRAMES, 0.6) == "退出"
+    assert "[unk]" in ScriptedRecognizer.grammars[-1]
+
+
+@pytest.mark.parametrize("text", ["[unk]", "退出 [unk]", "[unk] 再见", "你好甘薯"])
+def test_non_command_phrase_does_not_match(spotter, text):
+    ScriptedRecognizer.result = vosk_result(text)
+    assert spotter.match_command(FRAMES, 0.8) is None
+
+
+def test_low_confidence_and_long_utterances_do_not_match(spotter):
+    ScriptedRecognizer.result = vosk_result("再见", conf=0.4)
+    assert spotter.match_command(FRAMES, 0.6) is None
+    ScriptedRecognizer.result = vosk_result("再见")
+    assert spotter.match_command(FRAMES, 3.0) is None
+
+
+class SlowSpotter:
+    def __init__(self, command, delay):
+        self.command = command
+        self.delay = delay
+
+    def match_command(self, frames, duration):
+        time.sleep(self.delay)
+        return self.command
+
+
+def make_helper(spotter, latency):
+    helper = ASRhelper.__new__(ASRhelper)
+    helper.requester = ResilientASR(StandInBackend(text="云端结果", latency=latency), deadline=5.0, hedge=False)
+    helper.backend = helper.requester.backends[0]
+    helper.spotter = spotter
+    helper.RATE = 16000
+    return helper
+
+
+def timed_transcribe(helper):
+    """返回 (识别结果, 用时)；只计协程本身，不含事件循环退出时等待后台线程的时间"""
+    async def run():
+        now = time.time()
+        start = time.perf_counter()
+        result = await helper.transcribe(Utterance(FRAMES, now - 0.8, now, now + 0.3, "silence"))
+        return result, time.perf_counter() - start
+    return asyncio.run(run())
+
+
+def test_command_match_runs_alongside_upload():
+    helper = make_helper(SlowSpotter(None, delay=0.3), latency=0.3)
+    result, elapsed = timed_transcribe(helper)
+    assert result["result"] == ["云端结果"]
+    assert elapsed < 0.5
+
+
+def test_local_command_cancels_upload():
+    helper = make_helper(SlowSpotter("退出", delay=0.05), latency=1.0)
+    result, elapsed = timed_transcribe(helper)
+    assert result == {'err_no': 0, 'err_msg': 'local', 'result': ["退出"]}
+    assert elapsed < 0.5
@@ -0,0 +1,62 @@
+import time
+import asyncio
+from ASR.backends import StandInBackend
+from ASR.resilient import ResilientASR, CircuitBreaker
+
+FRAMES = [b"\x00\x01" * 320]
+
+
+def open_breaker(breaker):
+    """让熔断器处于已过冷却期的半开状态"""
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    open_breaker(breaker)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_cancelled_trial_releases_the_half_open_breaker():
+    slow = StandInBackend(latency=0.5)
+    asr = ResilientASR(slow, deadline=5.0, hedge=False)
+    breaker = asr.breakers[id(slow)]
+    open_breaker(breaker)
+
+    async def run():
+        request = asyncio.create_task(asr.transcribe(FRAMES))
+        await asyncio.sleep(0.05)
+        assert breaker.trial
+        request.cancel()
+        try:
+            await request
+        except asyncio.CancelledError:
+            pass
+        assert not breaker.trial
+        # 后端没有被锁死：下一次请求仍然可以作为试探请求发出并关闭熔断器
+        slow.latency = 0.0
+        return await asr.transcribe(FRAMES)
+
+    result = asyncio.run(run())
+    assert result["err_no"] == 0
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_under_wait_for_releases_the_breaker():
+    slow = StandInBackend(latency=0.5)
+    asr = ResilientASR(slow, deadline=5.0, hedge=False)
+    breaker = asr.breakers[id(slow)]
+    open_breaker(breaker)
+
+    async def run():
+        try:
+            await asyncio.wait_for(asr.transcribe(FRAMES), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert not breaker.trial
+    assert breaker.allow()
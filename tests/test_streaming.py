@@ -0,0 +1,49 @@
+import json
+import asyncio
+from ASR.streaming import StreamingSession
+
+
+class ScriptedSocket:
+    """按顺序吐出预设消息的假连接"""
+
+    def __init__(self, messages):
+        self.messages = [json.dumps(m) for m in messages]
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(data)
+
+    async def close(self):
+        pass
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for message in self.messages:
+            yield message
+
+
+def run_session(messages):
+    async def run():
+        session = StreamingSession(ScriptedSocket(messages), {})
+        return await session.finish(timeout=1.0)
+    return asyncio.run(run())
+
+
+def test_error_after_final_segments_keeps_the_text():
+    result = run_session([
+        {"type": "FIN_TEXT", "err_no": 0, "result": "你好，"},
+        {"type": "FIN_TEXT", "err_no": 0, "result": "我想问一下"},
+        {"type": "FIN_TEXT", "err_no": -3005, "err_msg": "asr server error"},
+    ])
+    assert result == {'err_no': 0, 'err_msg': 'success.', 'result': ["你好，我想问一下"]}
+
+
+def test_error_before_any_segment_is_returned():
+    result = run_session([
+        {"type": "MID_TEXT", "err_no": 0, "result": "你"},
+        {"type": "FIN_TEXT", "err_no": -3005, "err_msg": "asr server error"},
+    ])
+    assert result["err_no"] == -3005
+    assert result["result"] == []
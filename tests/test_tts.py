@@ -0,0 +1,78 @@
+import shutil
+import asyncio
+import pytest
+
+pytest.importorskip("edge_tts")
+if shutil.which("mpg123") is None:
+    pytest.skip("需要 mpg123 播放器", allow_module_level=True)
+
+from TTS import tts
+from TTS.mp3 import mp3_duration
+
+# MPEG1 Layer III，128kbps，44.1kHz，每帧417字节、约26ms
+FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+class FlakyCache:
+    """前 fail_times 次合成在产出 chunks 块音频后出错，之后正常"""
+
+    def __init__(self, chunks, fail_times):
+        self.chunks = chunks
+        self.fail_times = fail_times
+        self.calls = 0
+
+    async def stream(self, text, voice, rate, volume):
+        self.calls += 1
+        for _ in range(self.chunks):
+            yield FRAME * 10
+        if self.calls <= self.fail_times:
+            raise ConnectionError("连接断开")
+        yield FRAME * 10
+
+
+def make_helper(monkeypatch, cache):
+    monkeypatch.setattr(tts, "get_tts_cache", lambda: cache)
+    helper = tts.TTSHelper()
+    helper.retry_delay = 0
+    return helper
+
+
+def test_one_chunk_fills_the_jitter_buffer():
+    assert mp3_duration(FRAME * 10) >= 0.2
+
+
+def test_failure_before_any_audio_is_retried(monkeypatch):
+    cache = FlakyCache(chunks=0, fail_times=1)
+    helper = make_helper(monkeypatch, cache)
+    asyncio.run(helper.speak("你好"))
+    assert cache.calls == 2
+    assert not helper.is_speaking
+
+
+def test_failure_after_audio_was_played_is_not_replayed(monkeypatch):
+    cache = FlakyCache(chunks=2, fail_times=1)
+    helper = make_helper(monkeypatch, cache)
+    asyncio.run(helper.speak("你好"))
+    assert cache.calls == 1
+    assert not helper.is_speaking
+
+
+def test_player_spawn_failure_is_retried_after_a_played_sentence(monkeypatch):
+    cache = FlakyCache(chunks=1, fail_times=0)
+    helper = make_helper(monkeypatch, cache)
+    asyncio.run(helper.speak("第一句"))
+    assert helper.written_bytes > 0
+
+    spawn = asyncio.create_subprocess_exec
+    attempts = []
+
+    async def broken_spawn(*args, **kwargs):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise FileNotFoundError("mpg123")
+        return await spawn(*args, **kwargs)
+
+    monkeypatch.setattr(tts.asyncio, "create_subprocess_exec", broken_spawn)
+    asyncio.run(helper.speak("第二句"))
+    assert len(attempts) == 2
+    assert cache.calls == 2
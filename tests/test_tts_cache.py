@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import pytest
+
+pytest.importorskip("edge_tts")
+
+from TTS.cache import TTSCache, stop_warm_up
+
+VOICE = ("zh-CN-XiaoyiNeural", "+0%", "+0%")
+
+
+class CountingSynth:
+    """每段文本合成为100字节的音频，记录真正合成过的文本"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, text, voice, rate, volume):
+        self.calls.append(text)
+        yield text.encode("utf-8")[:1] * 60
+        yield b"\x00" * 40
+
+
+def make_cache(tmp_path, **kwargs):
+    synth = CountingSynth()
+    return TTSCache(str(tmp_path / "tts"), synthesize=synth, **kwargs), synth
+
+
+def fetch_all(cache, *texts):
+    async def run():
+        return [await cache.fetch(text, *VOICE) for text in texts]
+    return asyncio.run(run())
+
+
+def test_repeated_text_is_synthesized_once(tmp_path):
+    cache, synth = make_cache(tmp_path)
+    first, second, third = fetch_all(cache, "你好", "你好。", " 你好 ")
+    assert first == second == third and len(first) == 100
+    assert synth.calls == ["你好"]  # 标点和空白不同也命中同一条缓存
+    assert cache.stats["misses"] == 1 and cache.stats["memory_hits"] == 2
+
+
+def test_memory_lru_evicts_least_recently_used(tmp_path):
+    cache, synth = make_cache(tmp_path, memory_bytes=250)
+    fetch_all(cache, "a", "b", "a", "c")  # 容量两条：放入c时淘汰最久未用的b
+    summary = cache.summary()
+    assert summary["memory_items"] == 2 and summary["memory_bytes"] == 200
+
+    fetch_all(cache, "a", "b")
+    assert synth.calls == ["a", "b", "c"]  # b从磁盘读回，不再合成
+    assert cache.stats["disk_hits"] == 1
+
+
+def test_disk_cap_removes_oldest_files(tmp_path):
+    cache, synth = make_cache(tmp_path, disk_bytes=250)
+    fetch_all(cache, "a", "b", "c")
+    assert cache.stats["evictions"] == 1
+    assert len(list((tmp_path / "tts").glob("*.mp3"))) == 2
+    assert not (tmp_path / "tts" / f"{TTSCache.key('a', *VOICE)}.mp3").exists()
+
+    # 重启后按修改时间重建索引，留在磁盘上的仍然命中
+    reopened, synth = make_cache(tmp_path, disk_bytes=250)
+    assert not reopened.contains("a", *VOICE)
+    fetch_all(reopened, "b", "c")
+    assert synth.calls == [] and reopened.stats["disk_hits"] == 2
+
+
+def test_warmed_up_prompts_survive_eviction(tmp_path):
+    cache, synth = make_cache(tmp_path, memory_bytes=100, disk_bytes=150)
+    assert asyncio.run(cache.warm_up(["欢迎", "欢迎。", "再见"], *VOICE)) == 2
+    fetch_all(cache, "x", "y")
+    synth.calls.clear()
+    fetch_all(cache, "欢迎", "再见")
+    assert synth.calls == []
+    assert cache.summary()["resident_items"] == 2
+
+
+def test_stop_warm_up_cancels_a_running_task(caplog):
+    async def run():
+        task = asyncio.create_task(asyncio.sleep(10))
+        await asyncio.sleep(0)
+        await stop_warm_up(task)
+        return task
+
+    with caplog.at_level(logging.INFO):
+        task = asyncio.run(run())
+    assert task.cancelled()
+    assert "已取消" in caplog.text
+
+
+def test_stop_warm_up_retrieves_a_failure(caplog):
+    async def fail():
+        raise ConnectionError("网络不可用")
+
+    async def run():
+        task = asyncio.create_task(fail())
+        await asyncio.sleep(0)
+        await stop_warm_up(task)
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(run())
+    assert "网络不可用" in caplog.text
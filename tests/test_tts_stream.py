@@ -0,0 +1,79 @@
+import shutil
+import asyncio
+import pytest
+
+pytest.importorskip("edge_tts")
+if shutil.which("mpg123") is None:
+    pytest.skip("需要 mpg123 播放器", allow_module_level=True)
+
+from TTS import tts_stream
+
+# MPEG1 Layer III，128kbps，44.1kHz，每帧417字节、约26ms；40帧约1秒
+FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+SEGMENTS = ["第一段", "第二段", "第三段", "第四段", "第五段"]
+
+
+class SlowCache:
+    """每段约1秒音频，合成需要 delay 秒，记录合成过哪些文本"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.requested = []
+
+    async def stream(self, text, voice, rate, volume):
+        self.requested.append(text)
+        await asyncio.sleep(self.delay)
+        yield FRAME * 40
+
+
+def make_streamer(monkeypatch, cache):
+    monkeypatch.setattr(tts_stream, "get_tts_cache", lambda: cache)
+    return tts_stream.TTSStreamer(prefetch=2)
+
+
+def test_cancel_discards_queued_segments_and_stops_playback(monkeypatch):
+    cache = SlowCache()
+    played = []
+
+    async def run():
+        streamer = make_streamer(monkeypatch, cache)
+        streamer.on_segment_done = played.append
+        await streamer.start_speech_processor()
+        for text in SEGMENTS:
+            await streamer.speech_queue.put(text)
+        while not streamer._scheduled:  # 等第一段写入播放器
+            await asyncio.sleep(0.01)
+
+        cancelled = streamer.cancel()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.wait_for(streamer.wait_until_done(), 1.0)
+        elapsed = loop.time() - start
+        assert not streamer.is_speaking
+        await streamer.shutdown()
+        return cancelled, elapsed
+
+    cancelled, elapsed = asyncio.run(run())
+    assert cancelled >= 2
+    assert elapsed < 0.5  # 不等已写入的音频播完
+    assert len(cache.requested) < len(SEGMENTS)
+    assert played == ["第一段"]  # 只有打断前已写入播放器的段落结束，其余都被丢弃
+
+
+def test_speaking_after_cancel_plays_new_text(monkeypatch):
+    cache = SlowCache()
+
+    async def run():
+        streamer = make_streamer(monkeypatch, cache)
+        await streamer.speak_text("第一段,第二段")
+        while not streamer._scheduled:
+            await asyncio.sleep(0.01)
+        streamer.cancel()
+        await streamer.wait_until_done()
+        await streamer.speak_text("新的回答")
+        while not streamer._scheduled:
+            await asyncio.sleep(0.01)
+        await streamer.shutdown()
+
+    asyncio.run(run())
+    assert cache.requested[-1] == "新的回答,"